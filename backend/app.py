@@ -2,10 +2,27 @@ from flask import Flask, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
 import os
 from werkzeug.utils import secure_filename
-import pdfplumber
 from anthropic import Anthropic, HUMAN_PROMPT, AI_PROMPT
 from dotenv import load_dotenv
 import logging
+import json
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pdf_extraction import ACCURATE_ENGINE, ENGINES, FAST_ENGINE, MemoryLimitExceeded, iter_pdf_pages, page_fingerprints, scan_profile
+from extraction_cache import ExtractionCache, bytes_sha256, file_sha256
+from numeric_tokens import NumericTokens
+from page_store import PageStore, document_fingerprint
+from preflight import PreflightError, preflight
+from response_cache import DiskTier, MemoryTier, ResponseCache, response_key
+from page_analysis import locate_statement_pages, until_statements_end
+from boilerplate import estimate_tokens, strip_boilerplate
+from chunked_extraction import chunk_pages, merge_entities
+from statement_tables import extract_statement_regions, extract_statement_tables, format_statement_tables
+from text_store import TextStore
+from word_store import WordStore
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -34,138 +51,397 @@ CORS(app)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 ALLOWED_EXTENSIONS = {'pdf'}
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB limit
+# Uploads with more pages than this are turned away at preflight (0 = no limit)
+app.config['MAX_PDF_PAGES'] = int(os.getenv('MAX_PDF_PAGES', 0))
+# PDF text extraction: worker processes per document, and the page count below
+# which a document is parsed in the request process instead
+app.config['EXTRACTION_WORKERS'] = int(os.getenv('EXTRACTION_WORKERS', os.cpu_count() or 1))
+app.config['PARALLEL_EXTRACTION_MIN_PAGES'] = int(os.getenv('PARALLEL_EXTRACTION_MIN_PAGES', 16))
+# Release each page's parsed objects as soon as its text is out, and cap how
+# much memory one document's extraction may use (0 = no limit)
+app.config['LOW_MEMORY_EXTRACTION'] = os.getenv('LOW_MEMORY_EXTRACTION', 'false').lower() == 'true'
+app.config['EXTRACTION_MEMORY_LIMIT_MB'] = int(os.getenv('EXTRACTION_MEMORY_LIMIT_MB', 0))
+# Time budgets (seconds, 0 = none) for a single page and for a whole document;
+# pages over budget are skipped and reported instead of stalling the request
+app.config['PAGE_TIMEOUT_SECONDS'] = float(os.getenv('PAGE_TIMEOUT_SECONDS', 0))
+app.config['DOCUMENT_TIMEOUT_SECONDS'] = float(os.getenv('DOCUMENT_TIMEOUT_SECONDS', 0))
+# Default text extraction engine ('pdfplumber' or 'pdfium'); uploads can override it per request
+app.config['EXTRACTION_ENGINE'] = os.getenv('EXTRACTION_ENGINE', ACCURATE_ENGINE)
+# Only extract (and prompt with) the pages that look like the balance sheet and
+# income statement: the top-scoring pages plus their neighbours
+app.config['LOCATE_STATEMENT_PAGES'] = os.getenv('LOCATE_STATEMENT_PAGES', 'false').lower() == 'true'
+app.config['STATEMENT_PAGES_TOP_K'] = int(os.getenv('STATEMENT_PAGES_TOP_K', 4))
+app.config['STATEMENT_PAGES_NEIGHBORS'] = int(os.getenv('STATEMENT_PAGES_NEIGHBORS', 1))
+# Prompt with only the table region of each statement page (cropped and laid
+# out by pdfplumber) instead of the whole page. Saves prompt tokens, not parse
+# time: the region pass comes on top of the page's own extraction.
+app.config['CROP_STATEMENT_PAGES'] = os.getenv('CROP_STATEMENT_PAGES', 'false').lower() == 'true'
+# Stop parsing once the balance sheet and income statement have been seen and
+# STATEMENTS_MARGIN_PAGES pages without statements have followed them
+app.config['STOP_AFTER_STATEMENTS'] = os.getenv('STOP_AFTER_STATEMENTS', 'false').lower() == 'true'
+app.config['STATEMENTS_MARGIN_PAGES'] = int(os.getenv('STATEMENTS_MARGIN_PAGES', 2))
+# Extract label/value rows from the tables on statement pages, attach them to
+# the prompt and return them with the upload result
+app.config['EXTRACT_STATEMENT_TABLES'] = os.getenv('EXTRACT_STATEMENT_TABLES', 'false').lower() == 'true'
+# Drop lines repeated on at least BOILERPLATE_MIN_SHARE of the pages (running
+# headers, footers, page numbers, disclaimers) from the prompt, in documents of
+# at least BOILERPLATE_MIN_PAGES pages
+app.config['STRIP_BOILERPLATE'] = os.getenv('STRIP_BOILERPLATE', 'false').lower() == 'true'
+app.config['BOILERPLATE_MIN_SHARE'] = float(os.getenv('BOILERPLATE_MIN_SHARE', 0.5))
+app.config['BOILERPLATE_MIN_PAGES'] = int(os.getenv('BOILERPLATE_MIN_PAGES', 4))
+# What to do with scanned documents (no text layer on at least
+# SCANNED_DOCUMENT_RATIO of their pages): 'skip' returns them without calling
+# the model, 'reject' fails the upload with HTTP 422, 'extract' treats them
+# like any other document
+app.config['SCANNED_DOCUMENTS'] = os.getenv('SCANNED_DOCUMENTS', 'skip').lower()
+app.config['SCANNED_DOCUMENT_RATIO'] = float(os.getenv('SCANNED_DOCUMENT_RATIO', 0.8))
+# Return where in the text each extracted amount is printed
+app.config['ENTITY_PROVENANCE'] = os.getenv('ENTITY_PROVENANCE', 'false').lower() == 'true'
+# Content-addressed cache of page text and entities, shared by identical uploads
+app.config['EXTRACTION_CACHE_DIR'] = os.getenv('EXTRACTION_CACHE_DIR', os.path.join(current_dir, 'cache', 'extractions'))
+app.config['EXTRACTION_CACHE_MAX_BYTES'] = int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# Page text keyed by page content fingerprint, reused across revisions of a document
+app.config['PAGE_STORE_PATH'] = os.getenv('PAGE_STORE_PATH', os.path.join(current_dir, 'cache', 'pages.sqlite3'))
+app.config['PAGE_STORE_MAX_PAGES'] = int(os.getenv('PAGE_STORE_MAX_PAGES', 200000))
+# Compressed, page-addressable text of every uploaded document, served by /text/<document_id>
+app.config['TEXT_STORE_DIR'] = os.getenv('TEXT_STORE_DIR', os.path.join(current_dir, 'cache', 'text'))
+app.config['TEXT_STORE_MAX_DOCUMENTS'] = int(os.getenv('TEXT_STORE_MAX_DOCUMENTS', 10000))
+# Word positions (for highlighting values in the viewer), stored per document
+# at upload time and served by /words/<document_id>
+app.config['BUILD_WORD_STORE'] = os.getenv('BUILD_WORD_STORE', 'false').lower() == 'true'
+app.config['WORD_STORE_DIR'] = os.getenv('WORD_STORE_DIR', os.path.join(current_dir, 'cache', 'words'))
+app.config['WORD_STORE_MAX_DOCUMENTS'] = int(os.getenv('WORD_STORE_MAX_DOCUMENTS', 1000))
+# Extract the balance sheet and income statement with separate, concurrent calls
+app.config['SECTION_EXTRACTION'] = os.getenv('SECTION_EXTRACTION', 'false').lower() == 'true'
+# Long documents are split into page-aligned chunks of at most this many
+# (estimated) tokens, extracted concurrently and merged
+app.config['CHUNKED_EXTRACTION'] = os.getenv('CHUNKED_EXTRACTION', 'false').lower() == 'true'
+app.config['CHUNK_TOKEN_BUDGET'] = int(os.getenv('CHUNK_TOKEN_BUDGET', 24000))
+app.config['CHUNK_CONCURRENCY'] = int(os.getenv('CHUNK_CONCURRENCY', 4))
+# Send the tools schema and instructions as a cached prompt prefix
+app.config['PROMPT_CACHING'] = os.getenv('PROMPT_CACHING', 'true').lower() == 'true'
+# Model responses keyed by model, tools schema, prompt template and prompt text,
+# in memory and on disk, so identical prompts skip the API call
+app.config['LLM_CACHE'] = os.getenv('LLM_CACHE', 'true').lower() == 'true'
+app.config['LLM_CACHE_MEMORY_ENTRIES'] = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', 256))
+app.config['LLM_CACHE_DIR'] = os.getenv('LLM_CACHE_DIR', os.path.join(current_dir, 'cache', 'llm'))
+app.config['LLM_CACHE_MAX_BYTES'] = int(os.getenv('LLM_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+app.config['LLM_CACHE_TTL_SECONDS'] = int(os.getenv('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+# Durable state of bulk backfills through the Message Batches API (see backfill.py)
+app.config['BATCH_STORE_PATH'] = os.getenv('BATCH_STORE_PATH', os.path.join(current_dir, 'cache', 'batches.sqlite3'))
+app.config['BATCH_MAX_REQUESTS'] = int(os.getenv('BATCH_MAX_REQUESTS', 1000))
+# JSON-lines record of per-document extraction timings, to find slow documents
+app.config['EXTRACTION_TIMINGS_LOG'] = os.getenv('EXTRACTION_TIMINGS_LOG', os.path.join(current_dir, 'cache', 'extraction_timings.jsonl'))
+os.makedirs(os.path.dirname(app.config['EXTRACTION_TIMINGS_LOG']), exist_ok=True)
+
+extraction_cache = ExtractionCache(app.config['EXTRACTION_CACHE_DIR'], app.config['EXTRACTION_CACHE_MAX_BYTES'])
+page_store = PageStore(app.config['PAGE_STORE_PATH'], app.config['PAGE_STORE_MAX_PAGES'])
+text_store = TextStore(app.config['TEXT_STORE_DIR'], app.config['TEXT_STORE_MAX_DOCUMENTS'])
+word_store = WordStore(app.config['WORD_STORE_DIR'], app.config['WORD_STORE_MAX_DOCUMENTS'])
+response_cache = ResponseCache([
+    MemoryTier(app.config['LLM_CACHE_MEMORY_ENTRIES'], app.config['LLM_CACHE_TTL_SECONDS']),
+    DiskTier(app.config['LLM_CACHE_DIR'], app.config['LLM_CACHE_MAX_BYTES'], app.config['LLM_CACHE_TTL_SECONDS'])
+]) if app.config['LLM_CACHE'] else None
+
+# Files of an upload are processed concurrently, this many at a time (across
+# requests). Each may fork EXTRACTION_WORKERS extraction processes of its own.
+app.config['UPLOAD_CONCURRENCY'] = int(os.getenv('UPLOAD_CONCURRENCY', 4))
+upload_pool = ThreadPoolExecutor(max_workers=app.config['UPLOAD_CONCURRENCY'], thread_name_prefix='upload')
+# Uploads are parsed straight from memory while this pool writes them to
+# UPLOAD_FOLDER
+upload_writer = ThreadPoolExecutor(max_workers=4, thread_name_prefix='upload-writer')
+# Text stores are written on their own pool, so they never hold up the save
+# that a response waits for
+index_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix='index-writer')
+# Word position stores parse every page again, so they are built in a process
+# of their own rather than on threads that share the GIL with requests
+word_store_builder = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('forkserver'))
+# Store builds queued or running, so a file uploaded twice is stored once
+pending_builds = set()
+pending_builds_lock = threading.Lock()
+# Model calls for the chunks of long documents, this many at a time (across uploads)
+chunk_pool = ThreadPoolExecutor(max_workers=app.config['CHUNK_CONCURRENCY'], thread_name_prefix='chunk')
+
+MODEL_NAME = "claude-3-5-sonnet-20240620"
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text_from_pdf(pdf_path):
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text()
-    return text
-
-def extract_key_fields(text):
-    MODEL_NAME = "claude-3-5-sonnet-20240620"
-
-    tools = [
-        {
-            "name": "extract_financial_entities",
-            "description": "Extracts financial entities from the text.",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "company_name": {"type": "string"},
-                    "assets": {
-                        "type": "object",
-                        "properties": {
-                            "current_assets": {
-                                "type": "object",
-                                "properties": {
-                                    "cash_and_cash_equivalents": {"type": "number"},
-                                    "accounts_receivable": {"type": "number"},
-                                    "prepaid_expenses": {"type": "number"},
-                                    "total_current_assets": {"type": "number"}
-                                }
-                            },
-                            "non_current_assets": {
-                                "type": "object",
-                                "properties": {
-                                    "property_plant_and_equipment": {"type": "number"},
-                                    "accumulated_depreciation": {"type": "number"},
-                                    "total_property_plant_and_equipment": {"type": "number"},
-                                    "investments": {"type": "number"},
-                                    "total_non_current_assets": {"type": "number"}
-                                }
-                            },
-                            "total_assets": {"type": "number"}
-                        }
-                    },
-                    "liabilities_and_equity": {
-                        "type": "object",
-                        "properties": {
-                            "current_liabilities": {
-                                "type": "object",
-                                "properties": {
-                                    "accounts_payable": {"type": "number"},
-                                    "short_term_debt": {"type": "number"},
-                                    "accrued_expenses": {"type": "number"},
-                                    "total_current_liabilities": {"type": "number"}
-                                }
-                            },
-                            "non_current_liabilities": {
-                                "type": "object",
-                                "properties": {
-                                    "long_term_debt": {"type": "number"},
-                                    "total_non_current_liabilities": {"type": "number"}
-                                }
-                            },
-                            "total_liabilities": {"type": "number"},
-                            "equity": {
-                                "type": "object",
-                                "properties": {
-                                    "common_stock": {"type": "number"},
-                                    "retained_earnings": {"type": "number"},
-                                    "total_equity": {"type": "number"}
-                                }
-                            },
-                            "total_liabilities_and_equity": {"type": "number"}
-                        }
-                    },
-                    "income_statement": {
-                        "type": "object",
-                        "properties": {
-                            "revenue": {
-                                "type": "object",
-                                "properties": {
-                                    "sales_revenue": {"type": "number"},
-                                    "rental_income": {"type": "number"},
-                                    "total_revenue": {"type": "number"}
-                                }
-                            },
-                            "expenses": {
-                                "type": "object",
-                                "properties": {
-                                    "cost_of_goods_sold": {"type": "number"},
-                                    "operating_expenses": {"type": "number"},
-                                    "depreciation": {"type": "number"},
-                                    "interest_expense": {"type": "number"},
-                                    "total_expenses": {"type": "number"}
-                                }
-                            },
-                            "net_income": {"type": "number"}
-                        }
+class UploadError(Exception):
+    # A file of an upload that could not be processed, and the HTTP status for it
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+def check_upload(filename, data):
+    # Preflight reads only the header, trailer and cross-reference table, so
+    # files we cannot process are turned away before anything is parsed or saved.
+    # Returns the preflight stats.
+    try:
+        info = preflight(data)
+    except PreflightError as e:
+        app.logger.error(f"Preflight rejected {filename}: {e}")
+        raise UploadError(f'{filename}: {e}', 422)
+    if app.config['MAX_PDF_PAGES'] and info['pages'] > app.config['MAX_PDF_PAGES']:
+        app.logger.error(f"Preflight rejected {filename}: {info['pages']} pages")
+        raise UploadError(f"{filename}: {info['pages']} pages, over the {app.config['MAX_PDF_PAGES']} page limit", 413)
+    app.logger.info(f"Preflight of {filename}: {info}")
+    return info
+
+def save_upload(data, filepath):
+    # Write under a temporary name so /uploads never serves a partial file
+    tmp_path = f'{filepath}.part'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, filepath)
+    app.logger.info(f"File saved: {filepath}")
+
+def discard_upload(saved, filepath):
+    # For a file rejected after its save started: /uploads must not serve it
+    wait([saved])
+    try:
+        os.remove(filepath)
+        app.logger.info(f"File removed: {filepath}")
+    except FileNotFoundError:
+        pass
+
+def submit_build(executor, description, function, *args):
+    # For store builds that nothing waits for: failures are only logged, and
+    # a build with the same description already pending is not repeated
+    with pending_builds_lock:
+        if description in pending_builds:
+            return
+        pending_builds.add(description)
+
+    def done(future):
+        with pending_builds_lock:
+            pending_builds.discard(description)
+        if future.exception():
+            app.logger.error(f"Failed: {description}: {future.exception()}")
+        else:
+            app.logger.info(f"Done: {description}")
+
+    executor.submit(function, *args).add_done_callback(done)
+
+def pdf_label(pdf_path):
+    # For log messages: uploads are parsed from their bytes, which we don't want in the log
+    return f'<{len(pdf_path)}-byte upload>' if isinstance(pdf_path, bytes) else pdf_path
+
+def iter_pages(pdf_path, page_numbers=None, engine=None, stats=None):
+    return iter_pdf_pages(
+        pdf_path,
+        workers=app.config['EXTRACTION_WORKERS'],
+        min_pages_for_parallel=app.config['PARALLEL_EXTRACTION_MIN_PAGES'],
+        page_numbers=page_numbers,
+        engine=engine or app.config['EXTRACTION_ENGINE'],
+        low_memory=app.config['LOW_MEMORY_EXTRACTION'],
+        memory_limit=app.config['EXTRACTION_MEMORY_LIMIT_MB'] * 1024 * 1024 or None,
+        page_timeout=app.config['PAGE_TIMEOUT_SECONDS'] or None,
+        document_timeout=app.config['DOCUMENT_TIMEOUT_SECONDS'] or None,
+        stats=stats
+    )
+
+def join_pages(pages):
+    return "\n".join(text for _, text in pages)
+
+# Tool the model fills in with the extracted entities. Part of the response
+# cache key, so changing it invalidates cached responses.
+EXTRACTION_TOOLS = [
+    {
+        "name": "extract_financial_entities",
+        "description": "Extracts financial entities from the text.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "company_name": {"type": "string"},
+                "assets": {
+                    "type": "object",
+                    "properties": {
+                        "current_assets": {
+                            "type": "object",
+                            "properties": {
+                                "cash_and_cash_equivalents": {"type": "number"},
+                                "accounts_receivable": {"type": "number"},
+                                "prepaid_expenses": {"type": "number"},
+                                "total_current_assets": {"type": "number"}
+                            }
+                        },
+                        "non_current_assets": {
+                            "type": "object",
+                            "properties": {
+                                "property_plant_and_equipment": {"type": "number"},
+                                "accumulated_depreciation": {"type": "number"},
+                                "total_property_plant_and_equipment": {"type": "number"},
+                                "investments": {"type": "number"},
+                                "total_non_current_assets": {"type": "number"}
+                            }
+                        },
+                        "total_assets": {"type": "number"}
                     }
                 },
-                "required": ["company_name", "assets", "liabilities_and_equity", "income_statement"]
-            }
+                "liabilities_and_equity": {
+                    "type": "object",
+                    "properties": {
+                        "current_liabilities": {
+                            "type": "object",
+                            "properties": {
+                                "accounts_payable": {"type": "number"},
+                                "short_term_debt": {"type": "number"},
+                                "accrued_expenses": {"type": "number"},
+                                "total_current_liabilities": {"type": "number"}
+                            }
+                        },
+                        "non_current_liabilities": {
+                            "type": "object",
+                            "properties": {
+                                "long_term_debt": {"type": "number"},
+                                "total_non_current_liabilities": {"type": "number"}
+                            }
+                        },
+                        "total_liabilities": {"type": "number"},
+                        "equity": {
+                            "type": "object",
+                            "properties": {
+                                "common_stock": {"type": "number"},
+                                "retained_earnings": {"type": "number"},
+                                "total_equity": {"type": "number"}
+                            }
+                        },
+                        "total_liabilities_and_equity": {"type": "number"}
+                    }
+                },
+                "income_statement": {
+                    "type": "object",
+                    "properties": {
+                        "revenue": {
+                            "type": "object",
+                            "properties": {
+                                "sales_revenue": {"type": "number"},
+                                "rental_income": {"type": "number"},
+                                "total_revenue": {"type": "number"}
+                            }
+                        },
+                        "expenses": {
+                            "type": "object",
+                            "properties": {
+                                "cost_of_goods_sold": {"type": "number"},
+                                "operating_expenses": {"type": "number"},
+                                "depreciation": {"type": "number"},
+                                "interest_expense": {"type": "number"},
+                                "total_expenses": {"type": "number"}
+                            }
+                        },
+                        "net_income": {"type": "number"}
+                    }
+                }
+            },
+            "required": ["company_name", "assets", "liabilities_and_equity", "income_statement"]
         }
-    ]
+    }
+]
+
+# System prompt of every extraction. With the tools it makes up the static
+# prefix of the request, ahead of the document.
+EXTRACTION_INSTRUCTIONS = """Use the {tool} tool to extract financial entities from the document in the user's message.
+If you can't find a specific value, use 0.0 as the default.
+
+When the message also has statement_tables, they are rows parsed from the tables in the document.
+Prefer their values when they cover a field."""
+
+# Sections of the entities that can be extracted separately, with the
+# statement whose pages each one is read from (see page_analysis.STATEMENTS)
+EXTRACTION_SECTIONS = {
+    'balance_sheet': ['company_name', 'assets', 'liabilities_and_equity'],
+    'income_statement': ['income_statement']
+}
+
+def section_tools(section):
+    # EXTRACTION_TOOLS cut down to the properties of one section
+    schema = EXTRACTION_TOOLS[0]["input_schema"]
+    properties = {name: schema["properties"][name] for name in EXTRACTION_SECTIONS[section]}
+    return [{
+        "name": f"extract_{section}",
+        "description": f"Extracts the {section.replace('_', ' ')} entities from the text.",
+        "input_schema": {"type": "object", "properties": properties, "required": list(properties)}
+    }]
+
+SECTION_TOOLS = {section: section_tools(section) for section in EXTRACTION_SECTIONS}
+# Section calls of every upload in progress can run at once
+section_pool = ThreadPoolExecutor(
+    max_workers=len(EXTRACTION_SECTIONS) * app.config['UPLOAD_CONCURRENCY'], thread_name_prefix='section'
+)
+
+def extraction_request(query, tools=EXTRACTION_TOOLS):
+    # Keyword arguments of client.messages.create for one extraction prompt.
+    # Tools come first in the prompt, then the system prompt: the cache
+    # breakpoint on the system prompt makes both a cached prefix, so repeat
+    # calls only pay full price for the document.
+    system = {"type": "text", "text": EXTRACTION_INSTRUCTIONS.format(tool=tools[0]["name"])}
+    if app.config['PROMPT_CACHING']:
+        system["cache_control"] = {"type": "ephemeral"}
+    return {
+        "model": MODEL_NAME,
+        "max_tokens": 4096,
+        "tools": tools,
+        "system": [system],
+        "messages": [{"role": "user", "content": query}]
+    }
+
+def model_usage(response):
+    # Token counts of one API call; the cache fields are None when nothing was cached
+    usage = response.usage
+    return {
+        'input_tokens': usage.input_tokens,
+        'output_tokens': usage.output_tokens,
+        'cache_creation_input_tokens': usage.cache_creation_input_tokens or 0,
+        'cache_read_input_tokens': usage.cache_read_input_tokens or 0
+    }
+
+def tool_answer(message, tools=EXTRACTION_TOOLS):
+    # Input of the extraction tool call in a model message, or None
+    for content in message.content:
+        if content.type == "tool_use" and content.name == tools[0]["name"]:
+            return content.input
+    return None
+
+def extraction_query(pages, tables=None):
+    # The user message of an extraction: the document, and its statement tables if any
+    tables_block = ""
+    if tables:
+        tables_block = f"""
+    <statement_tables>
+    {format_statement_tables(tables)}
+    </statement_tables>
+    """
 
-    query = f"""
+    return f"""
     <document>
-    {text}
+    {join_pages(pages)}
     </document>
+    {tables_block}"""
 
-    Use the extract_financial_entities tool to extract financial entities from the text. 
-    If you can't find a specific value, use 0.0 as the default.
-    """
+def extract_key_fields(pages, tables=None, stats=None, tools=EXTRACTION_TOOLS):
+    query = extraction_query(pages, tables)
+    cache_key = response_key(MODEL_NAME, tools, EXTRACTION_INSTRUCTIONS, query) if response_cache else None
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
     try:
-        response = client.messages.create(
-            model=MODEL_NAME,
-            max_tokens=4096,
-            tools=tools,
-            messages=[{"role": "user", "content": query}]
-        )
+        response = client.messages.create(**extraction_request(query, tools))
+        usage = model_usage(response)
+        app.logger.info(f"Model call usage: {usage}")
+        if stats is not None:
+            stats.setdefault('model_calls', []).append(usage)
 
-        extracted_entities = None
-        for content in response.content:
-            if content.type == "tool_use" and content.name == "extract_financial_entities":
-                extracted_entities = content.input
-                break
+        extracted_entities = tool_answer(response, tools)
 
         if extracted_entities:
+            # Only real answers are cached: the fallback below and errors are retried next time
+            if cache_key:
+                response_cache.put(cache_key, extracted_entities)
             return extracted_entities
         else:
             return {
@@ -225,6 +501,285 @@ def extract_key_fields(text):
         print(f"Error calling Anthropic API: {str(e)}")
         return None
 
+def extract_key_fields_chunked(pages, tables=None, stats=None):
+    # Map-reduce over page-aligned chunks under CHUNK_TOKEN_BUDGET, so each
+    # call stays within the context window and its latency stays bounded
+    chunks = chunk_pages(pages, app.config['CHUNK_TOKEN_BUDGET'])
+    if len(chunks) <= 1:
+        return extract_key_fields(pages, tables, stats)
+    app.logger.info(f"Extracting entities from {len(chunks)} chunks of {len(pages)} pages")
+    if stats is not None:
+        stats['chunks'] = len(chunks)
+
+    def extract_chunk(chunk):
+        # Each chunk only gets the statement tables of its own pages
+        page_numbers = {page_number for page_number, _ in chunk}
+        chunk_tables = [table for table in tables or [] if table['page'] in page_numbers]
+        return extract_key_fields(chunk, chunk_tables or None, stats)
+
+    partials = list(chunk_pool.map(extract_chunk, chunks))
+    # A failed chunk fails the document, like a failed single call, so it is retried
+    if any(partial is None for partial in partials):
+        return None
+    return merge_entities(partials)
+
+def extract_key_fields_by_section(pages, tables=None, stats=None):
+    # One call per section of EXTRACTION_SECTIONS, all at once and each with
+    # only its statement's pages, merged back into the shape of
+    # extract_key_fields: latency is the slowest section, not the sum
+    texts = [text for _, text in pages]
+
+    def extract_section(section):
+        positions = locate_statement_pages(
+            texts,
+            top_k=app.config['STATEMENT_PAGES_TOP_K'],
+            neighbors=app.config['STATEMENT_PAGES_NEIGHBORS'],
+            statement=section
+        )
+        # Nothing looks like this statement: give the section every page
+        section_pages = [pages[position - 1] for position in positions] or pages
+        page_numbers = {page_number for page_number, _ in section_pages}
+        section_tables = [table for table in tables or [] if table['page'] in page_numbers]
+        app.logger.info(f"Extracting {section} from pages {sorted(page_numbers)}")
+        return extract_key_fields(section_pages, section_tables or None, stats, SECTION_TOOLS[section])
+
+    results = list(section_pool.map(extract_section, EXTRACTION_SECTIONS))
+    # A failed section fails the document, like a failed single call, so it is retried
+    if any(result is None for result in results):
+        return None
+    # A section without a tool answer gets the full zero fallback: keep only its own fields
+    return {
+        name: result.get(name)
+        for section, result in zip(EXTRACTION_SECTIONS, results)
+        for name in EXTRACTION_SECTIONS[section]
+    }
+
+def locate_statement_page_numbers(pdf_path):
+    # Cheap pre-pass over PDFium text (no pdfplumber fallback) to find the statements
+    texts = [text for _, text in iter_pdf_pages(pdf_path, engine=FAST_ENGINE, fallback=False)]
+    page_numbers = locate_statement_pages(
+        texts,
+        top_k=app.config['STATEMENT_PAGES_TOP_K'],
+        neighbors=app.config['STATEMENT_PAGES_NEIGHBORS']
+    )
+    app.logger.info(f"Statement pages of {pdf_label(pdf_path)}: {page_numbers} of {len(texts)}")
+    # Nothing looks like a statement: fall back to the whole document
+    return page_numbers or list(range(1, len(texts) + 1))
+
+def scanned_document_pages(pdf_path):
+    # The scanned pages of a document that is mostly scans, or None. There is
+    # no text for the model to read on them, so a call would only come back
+    # with the all-zero fallback.
+    profile = scan_profile(pdf_path)
+    scanned = [page['page'] for page in profile if page['scanned']]
+    if profile and len(scanned) >= app.config['SCANNED_DOCUMENT_RATIO'] * len(profile):
+        app.logger.info(f"{pdf_label(pdf_path)} looks scanned: {len(scanned)} of {len(profile)} pages have no text")
+        return scanned
+    return None
+
+def statement_table_page_numbers(pages):
+    # Tables are only parsed on the top-scoring pages themselves, not their neighbours
+    positions = locate_statement_pages(
+        [text for _, text in pages],
+        top_k=app.config['STATEMENT_PAGES_TOP_K'],
+        neighbors=0
+    )
+    return [pages[position - 1][0] for position in positions]
+
+def strip_prompt_boilerplate(pages, stats, document_texts=None):
+    # Boilerplate would otherwise be sent to the model once per page
+    pages, removed = strip_boilerplate(
+        pages, app.config['BOILERPLATE_MIN_SHARE'], app.config['BOILERPLATE_MIN_PAGES'], document_texts
+    )
+    stats['boilerplate'] = {'lines_removed': len(removed), 'tokens_saved': estimate_tokens('\n'.join(removed))}
+    app.logger.info(f"Stripped boilerplate from the prompt: {stats['boilerplate']}")
+    return pages
+
+def crop_statement_pages(pdf_path, document):
+    # Swap each statement page's text for the text of its table region
+    if document.get('regions') is None:
+        document['regions'] = extract_statement_regions(pdf_path, statement_table_page_numbers(document['pages']))
+    regions = dict(document['regions'])
+    pages = [(page_number, regions.get(page_number, text)) for page_number, text in document['pages']]
+    app.logger.info(
+        f"Cropped {len(regions)} statement pages of {pdf_label(pdf_path)}: "
+        f"{len(join_pages(document['pages']))} -> {len(join_pages(pages))} characters"
+    )
+    return pages
+
+def extract_changed_pages(pdf_path, fingerprints, engine, page_numbers=None, stats=None, until_statements=False):
+    # Only parse pages whose content streams we have not seen before. With
+    # until_statements, stop (and cancel the parsing of later pages) once the
+    # statements block is over.
+    if stats is None:
+        stats = {}
+    if page_numbers is None:
+        page_numbers = range(1, len(fingerprints) + 1)
+    wanted = {page_number: fingerprints[page_number - 1] for page_number in page_numbers}
+    known = page_store.get_texts(wanted.values())
+    changed = [page_number for page_number, fp in wanted.items() if fp not in known]
+    app.logger.info(f"Extracting {len(changed)} of {len(wanted)} pages of {pdf_label(pdf_path)} with {engine}")
+    parsed_pages = iter_pages(pdf_path, page_numbers=changed, engine=engine, stats=stats) if changed else None
+
+    def in_page_order():
+        # Known pages come from the store, the others as they are parsed (in page order)
+        for page_number, fp in wanted.items():
+            yield (page_number, known[fp]) if fp in known else next(parsed_pages)
+
+    pages = in_page_order()
+    if until_statements:
+        pages = until_statements_end(pages, margin=app.config['STATEMENTS_MARGIN_PAGES'])
+    try:
+        pages = list(pages)
+    finally:
+        if parsed_pages is not None:
+            parsed_pages.close()
+    if len(pages) < len(wanted):
+        stats['stopped_after_page'] = pages[-1][0]
+        app.logger.info(f"Statements of {pdf_label(pdf_path)} end by page {pages[-1][0]}; stopped there")
+    parsed = {page_number: text for page_number, text in pages if wanted[page_number] not in known}
+    # Pages skipped for running over their time budget have no real text to keep
+    skipped = stats.get('skipped_pages', {})
+    page_store.put_texts(
+        (wanted[page_number], text) for page_number, text in parsed.items() if page_number not in skipped
+    )
+    return pages
+
+def document_cache_key(digest, statements_only=False, until_statements=False):
+    # Extraction cache key of a document: each page selection is cached separately
+    if statements_only:
+        return f'{digest}-statements'
+    if until_statements:
+        return f'{digest}-until-statements'
+    return digest
+
+def prompt_options(with_tables=False, crop_statements=False, single_call=False):
+    # Everything besides the page text that shapes the prompt (and how it is
+    # sent), so entities extracted under other options are not reused
+    return json.dumps({
+        'tables': with_tables,
+        'crop': crop_statements,
+        'boilerplate': app.config['STRIP_BOILERPLATE'] and [
+            app.config['BOILERPLATE_MIN_SHARE'], app.config['BOILERPLATE_MIN_PAGES']
+        ],
+        'sections': not single_call and app.config['SECTION_EXTRACTION'],
+        'chunks': not single_call and app.config['CHUNKED_EXTRACTION'] and app.config['CHUNK_TOKEN_BUDGET']
+    }, sort_keys=True)
+
+def prompt_pages(pdf_path, document, crop_statements=False, stats=None, statements_only=False):
+    # The pages of a document as they are sent to the model
+    pages = document['pages']
+    if crop_statements:
+        pages = crop_statement_pages(pdf_path, document)
+    if app.config['STRIP_BOILERPLATE']:
+        # Boilerplate is found over the whole document (the uncropped text, or
+        # when only the statement pages were extracted, a cheap PDFium pass)
+        if statements_only:
+            document_texts = [text for _, text in iter_pdf_pages(pdf_path, engine=FAST_ENGINE, fallback=False)]
+        else:
+            document_texts = [text for _, text in document['pages']]
+        pages = strip_prompt_boilerplate(pages, stats if stats is not None else {}, document_texts)
+    return pages
+
+def extract_document(pdf_path, engine, statements_only=False, with_tables=False, stats=None, digest=None,
+                     until_statements=False, crop_statements=False, extract_entities=True):
+    # Identical bytes always produce identical pages, so serve them (and the
+    # entities, if the same model extracted them) from the cache when we can.
+    # Text from the accurate engine is good enough for any request.
+    # Without extract_entities, only the text (and tables) are extracted and cached.
+    if stats is None:
+        stats = {}
+    if digest is None:
+        digest = bytes_sha256(pdf_path) if isinstance(pdf_path, bytes) else file_sha256(pdf_path)
+    cache_key = document_cache_key(digest, statements_only, until_statements)
+    options = prompt_options(with_tables, crop_statements)
+    document = extraction_cache.get(cache_key)
+    if document and document.get('engine', ACCURATE_ENGINE) not in (engine, ACCURATE_ENGINE):
+        document = None
+    entities_fp = None
+    if document:
+        app.logger.info(f"Extraction cache hit for {pdf_label(pdf_path)} ({digest})")
+        updated = False
+    else:
+        # New bytes may still be a revision of a document we have seen: reuse the
+        # text of unchanged pages, and the entities if no page changed at all.
+        # Each engine's text is stored separately.
+        fingerprints = [f'{engine}:{fp}' for fp in page_fingerprints(pdf_path)]
+        page_numbers = locate_statement_page_numbers(pdf_path) if statements_only else None
+        pages = extract_changed_pages(
+            pdf_path, fingerprints, engine, page_numbers, stats, until_statements=until_statements and not statements_only
+        )
+        document_fp = document_fingerprint(fingerprints[page_number - 1] for page_number, _ in pages)
+        entities_fp = document_fingerprint([document_fp, options])
+        document = {
+            'pages': pages,
+            'engine': engine,
+            'entities': page_store.get_entities(entities_fp, MODEL_NAME),
+            'model': MODEL_NAME,
+            'prompt_options': options
+        }
+        updated = True
+
+    if with_tables and document.get('tables') is None:
+        document['tables'] = extract_statement_tables(pdf_path, statement_table_page_numbers(document['pages']))
+        updated = True
+
+    stale = document.get('model') != MODEL_NAME or document.get('prompt_options') != options
+    if extract_entities and (document.get('entities') is None or stale):
+        pages = prompt_pages(pdf_path, document, crop_statements, stats, statements_only)
+        extract = extract_key_fields
+        if app.config['SECTION_EXTRACTION']:
+            extract = extract_key_fields_by_section
+        elif app.config['CHUNKED_EXTRACTION']:
+            extract = extract_key_fields_chunked
+        entities = extract(pages, document.get('tables') if with_tables else None, stats)
+        document.update(entities=entities, model=MODEL_NAME, prompt_options=options)
+        updated = True
+        if entities is not None and entities_fp is not None and not stats.get('skipped_pages'):
+            page_store.put_entities(entities_fp, MODEL_NAME, entities)
+
+    # A document with skipped pages is incomplete; extract it again next time
+    if updated and not stats.get('skipped_pages'):
+        extraction_cache.put(cache_key, **document)
+    return document
+
+def entity_provenance(pages, entities):
+    # {field path: [{'page', 'offset', 'length'}, ...]} for every non-zero amount
+    # in the entities, looked up in one batch over the document's numeric tokens
+    amounts = {}
+
+    def collect(value, path):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                collect(child, f'{path}.{key}' if path else key)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and value:
+            amounts[path] = value
+
+    collect(entities, '')
+    if not amounts:
+        return {}
+    return dict(zip(amounts, NumericTokens(pages).locate(list(amounts.values()))))
+
+def record_extraction_stats(filename, stats):
+    # Per-document timings go to the log and to EXTRACTION_TIMINGS_LOG, so
+    # slow documents (and the pages that made them slow) can be found later
+    slowest = sorted(stats['page_seconds'].items(), key=lambda item: item[1], reverse=True)[:5]
+    summary = {
+        'seconds': round(stats['seconds'], 3),
+        'pages': len(stats['page_seconds']),
+        'peak_memory_mb': round(stats['peak_memory_bytes'] / (1024 * 1024), 1),
+        'slowest_pages': [{'page': page, 'seconds': round(seconds, 3)} for page, seconds in slowest],
+        'skipped_pages': [{'page': page, 'reason': reason} for page, reason in sorted(stats['skipped_pages'].items())]
+    }
+    if 'stopped_after_page' in stats:
+        summary['stopped_after_page'] = stats['stopped_after_page']
+    app.logger.info(f"Extraction stats for {filename}: {summary}")
+    if summary['skipped_pages']:
+        app.logger.warning(f"Skipped {len(summary['skipped_pages'])} pages of {filename} over the time budget")
+    with open(app.config['EXTRACTION_TIMINGS_LOG'], 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'time': time.time(), 'filename': filename, **summary}) + '\n')
+    return summary
+
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
@@ -255,6 +810,92 @@ def serve_upload(filename):
 def serve_uploaded_pdf(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename, mimetype='application/pdf')
 
+def process_upload(filename, data, engine):
+    # Everything for one uploaded file; runs on upload_pool. Returns the file's
+    # result, or raises UploadError.
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    # The upload is parsed from memory (Werkzeug has already buffered it,
+    # and MAX_CONTENT_LENGTH bounds its size) while it is written to
+    # UPLOAD_FOLDER, instead of writing it out and reading it back. Files
+    # rejected before or during extraction are not kept.
+    info = check_upload(filename, data)
+    
+    # Image-only documents are caught before any extraction or model call
+    scanned = scanned_document_pages(data) if app.config['SCANNED_DOCUMENTS'] != 'extract' else None
+    if scanned and app.config['SCANNED_DOCUMENTS'] == 'reject':
+        app.logger.error(f"Rejected scanned document: {filename}")
+        raise UploadError(f'{filename}: scanned document without a text layer, run OCR on it first', 422)
+    saved = upload_writer.submit(save_upload, data, filepath)
+    if scanned:
+        saved.result()
+        return {
+            'filename': filename,
+            'extracted_text': '',
+            'entities': None,
+            'pdfUrl': f'/uploads/{filename}',
+            'preflight': info,
+            'scanned': True,
+            'scanned_pages': scanned
+        }
+    
+    # Extract text (one (page_number, text) record per page) and
+    # entities using Claude API, or reuse them from the cache
+    stats = {}
+    digest = bytes_sha256(data)
+    try:
+        document = extract_document(
+            data,
+            engine,
+            statements_only=app.config['LOCATE_STATEMENT_PAGES'],
+            with_tables=app.config['EXTRACT_STATEMENT_TABLES'],
+            stats=stats,
+            digest=digest,
+            until_statements=app.config['STOP_AFTER_STATEMENTS'],
+            crop_statements=app.config['CROP_STATEMENT_PAGES']
+        )
+    except MemoryLimitExceeded as e:
+        app.logger.error(f"Extraction of {filepath} stopped: {e}")
+        discard_upload(saved, filepath)
+        raise UploadError(f'{filename}: {e}', 413)
+    # pdfUrl must point at a complete file
+    saved.result()
+    
+    result = {
+        'filename': filename,
+        'extracted_text': join_pages(document['pages']),
+        'entities': document['entities'],
+        'pdfUrl': f'/uploads/{filename}',
+        'preflight': info
+    }
+    if 'seconds' in stats:
+        result['extraction_stats'] = record_extraction_stats(filename, stats)
+    if 'boilerplate' in stats:
+        result['boilerplate'] = stats['boilerplate']
+    if 'chunks' in stats:
+        result['chunks'] = stats['chunks']
+    if 'model_calls' in stats:
+        # Totals over the document's model calls, and the calls themselves
+        result['model_usage'] = {
+            **{key: sum(call[key] for call in stats['model_calls']) for key in stats['model_calls'][0]},
+            'calls': stats['model_calls']
+        }
+    if app.config['ENTITY_PROVENANCE'] and document['entities']:
+        result['provenance'] = entity_provenance(document['pages'], document['entities'])
+    if app.config['EXTRACT_STATEMENT_TABLES']:
+        result['statement_tables'] = document['tables']
+    # Text and word positions are stored in the background; /text/<document_id>
+    # and /words/<document_id> answer 404 until they are ready. Only text of
+    # every page is kept: the statement pages alone (LOCATE_STATEMENT_PAGES,
+    # STOP_AFTER_STATEMENTS) or text with pages skipped over the time budget
+    # would be stored under the file's digest and never replaced.
+    complete = len(document['pages']) == info['pages'] and not stats.get('skipped_pages')
+    if complete and not text_store.has(digest):
+        submit_build(index_writer, f'store text of {digest}', text_store.put, digest, document['pages'])
+    if app.config['BUILD_WORD_STORE'] and not word_store.has(digest):
+        submit_build(word_store_builder, f'store word positions of {digest}', word_store.build, digest, data)
+    result['document_id'] = digest
+    return result
+
 @app.route('/upload', methods=['POST'])
 def upload_files():
     app.logger.info("Received upload request")
@@ -271,35 +912,96 @@ def upload_files():
         app.logger.error("No selected files")
         return jsonify({'error': 'No selected files'}), 400
     
-    results = []
+    engine = request.form.get('engine', app.config['EXTRACTION_ENGINE'])
+    if engine not in ENGINES:
+        app.logger.error(f"Unknown extraction engine: {engine}")
+        return jsonify({'error': f'Unknown extraction engine: {engine}'}), 400
     
     for file in files:
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            app.logger.info(f"File saved: {filepath}")
-            
-            # Extract text from PDF
-            extracted_text = extract_text_from_pdf(filepath)
-            
-            # Extract entities using Claude API
-            entities = extract_key_fields(extracted_text)
-            
-            result = {
-                'filename': filename,
-                'extracted_text': extracted_text,
-                'entities': entities,
-                'pdfUrl': f'/uploads/{filename}'
-            }
-            results.append(result)
-        else:
+        if not (file and allowed_file(file.filename)):
             app.logger.error(f"File type not allowed: {file.filename}")
             return jsonify({'error': f'File type not allowed: {file.filename}'}), 400
     
+    # Files are processed concurrently (at most UPLOAD_CONCURRENCY at a time,
+    # across requests), so a multi-file upload takes about as long as its
+    # slowest file. Results keep the order of the files.
+    futures = [
+        upload_pool.submit(process_upload, secure_filename(file.filename), file.read(), engine)
+        for file in files
+    ]
+    results = []
+    errors = []
+    for file, future in zip(files, futures):
+        filename = secure_filename(file.filename)
+        try:
+            results.append(future.result())
+            continue
+        except UploadError as e:
+            error = e
+        except Exception as e:
+            app.logger.exception(f"Processing of {filename} failed")
+            error = UploadError(f'{filename}: {e}', 500)
+        # One bad file does not fail the others
+        errors.append(error)
+        results.append({'filename': filename, 'error': str(error)})
+    
+    if len(errors) == len(files):
+        return jsonify({'error': str(errors[0])}), errors[0].status
     app.logger.info(f"Upload successful, returning results: {results}")  # Log the results
     return jsonify(results), 200
 
+@app.route('/preflight', methods=['POST'])
+def preflight_files():
+    # Page counts and flags of the uploaded files, without extracting (or
+    # saving) anything, for estimating cost and scheduling large batches
+    files = request.files.getlist('files')
+    if not files or files[0].filename == '':
+        return jsonify({'error': 'No selected files'}), 400
+    results = []
+    for file in files:
+        filename = secure_filename(file.filename)
+        try:
+            results.append({'filename': filename, 'preflight': preflight(file.read())})
+        except PreflightError as e:
+            results.append({'filename': filename, 'error': str(e)})
+    return jsonify(results), 200
+
+@app.route('/text/<document_id>')
+def document_text(document_id):
+    # ?page=N returns one page, ?first=N&last=M a range (both optional, inclusive)
+    page = request.args.get('page', type=int)
+    first = request.args.get('first', page, type=int)
+    last = request.args.get('last', page, type=int)
+    pages = text_store.get(document_id, first, last) if re.fullmatch(r'[0-9a-f]{64}', document_id) else None
+    if pages is None:
+        return jsonify({'error': f'No text stored for {document_id}'}), 404
+    if not pages:
+        return jsonify({'error': f'No such pages in {document_id}'}), 404
+    return jsonify({'pages': [{'page': page_number, 'text': text} for page_number, text in pages]})
+
+@app.route('/words/<document_id>')
+def document_words(document_id):
+    # ?page=N returns the words of one page; ?q=text finds a word (on one page,
+    # if page is also given). Boxes are in points from the page's top-left corner.
+    words = word_store.open(document_id) if re.fullmatch(r'[0-9a-f]{64}', document_id) else None
+    if words is None:
+        return jsonify({'error': f'No word positions stored for {document_id}'}), 404
+    page = request.args.get('page', type=int)
+    if page is not None and not 1 <= page <= words.page_count:
+        return jsonify({'error': f'Page out of range: {page}'}), 400
+    text = request.args.get('q')
+    if text:
+        return jsonify({'words': words.find(text, page)})
+    if page is None:
+        return jsonify({'error': 'page or q is required'}), 400
+    return jsonify({'page': page, **words.page_size(page), 'words': words.page_words(page)})
+
+@app.route('/llm-cache/stats')
+def llm_cache_stats():
+    if response_cache is None:
+        return jsonify({'error': 'The model response cache is disabled'}), 404
+    return jsonify(response_cache.stats())
+
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
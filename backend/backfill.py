@@ -0,0 +1,402 @@
+"""Re-extract archived filings in bulk through the Message Batches API.
+
+Batches run at batch pricing and outside the interactive rate limits, so a
+backfill of thousands of documents does not slow down uploads. Each document
+is parsed here, exactly as an upload would be, and its extraction prompt is
+queued; prompts are submitted in batches of BATCH_MAX_REQUESTS. Submitted
+requests and batches are tracked in the SQLite file at BATCH_STORE_PATH, so
+polling can stop and resume at any time. Results go to the extraction cache
+(and the model response cache) as each batch ends, where uploads of the same
+files find them.
+
+Run from the backend directory:
+
+    python -m backfill submit path/to/filings [more paths...] [--engine pdfium]
+    python -m backfill poll [--wait 60]
+    python -m backfill status
+
+--local swaps the API for LocalBatches, which answers every request with
+zeros from the tool schema without any network access, for testing.
+"""
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+from anthropic.types.messages import MessageBatch, MessageBatchIndividualResponse
+
+import app
+from response_cache import response_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    ended REAL
+);
+CREATE TABLE IF NOT EXISTS requests (
+    custom_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    batch_id TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_batch ON requests (batch_id);
+"""
+
+# Size limit of one batch in the API, with room for the JSON around each request
+MAX_BATCH_BYTES = 200 * 1024 * 1024
+
+# Requests in these states are not submitted again
+SUBMITTED_STATUSES = ('submitted', 'succeeded')
+
+
+class BatchStore:
+    """SQLite record of submitted batches and the status of each request.
+
+    A request is keyed by its custom_id (the model response cache key of its
+    prompt) and goes from 'pending' (recorded, batch not yet created) to
+    'submitted', then to the result type of its batch: 'succeeded', 'errored',
+    'canceled' or 'expired'. Requests that did not succeed are submitted again
+    by the next submit of the same files.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def status(self, custom_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT status FROM requests WHERE custom_id = ?', (custom_id,)).fetchone()
+        return row[0] if row else None
+
+    def request(self, custom_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT filename, cache_key FROM requests WHERE custom_id = ?', (custom_id,)).fetchone()
+        return {'filename': row[0], 'cache_key': row[1]} if row else None
+
+    def add_pending(self, requests):
+        # requests: (custom_id, filename, cache_key) recorded before their batch is created
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO requests (custom_id, filename, cache_key, batch_id, status, error, updated) '
+                "VALUES (?, ?, ?, NULL, 'pending', NULL, ?)",
+                ((custom_id, filename, cache_key, now) for custom_id, filename, cache_key in requests)
+            )
+
+    def add_batch(self, batch_id, custom_ids):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT INTO batches (batch_id, created) VALUES (?, ?)', (batch_id, now))
+            conn.executemany(
+                "UPDATE requests SET batch_id = ?, status = 'submitted', updated = ? WHERE custom_id = ?",
+                ((batch_id, now, custom_id) for custom_id in custom_ids)
+            )
+
+    def open_batches(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute('SELECT batch_id FROM batches WHERE ended IS NULL ORDER BY created')]
+
+    def finish_request(self, custom_id, status, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE requests SET status = ?, error = ?, updated = ? WHERE custom_id = ?',
+                (status, error, time.time(), custom_id)
+            )
+
+    def end_batch(self, batch_id):
+        with self._connect() as conn:
+            conn.execute('UPDATE batches SET ended = ? WHERE batch_id = ?', (time.time(), batch_id))
+            # Requests the results did not mention are lost with the batch
+            conn.execute(
+                "UPDATE requests SET status = 'expired', updated = ? WHERE batch_id = ? AND status = 'submitted'",
+                (time.time(), batch_id)
+            )
+
+    def counts(self):
+        with self._connect() as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM requests GROUP BY status'))
+
+
+def _zeros(schema):
+    # The answer to a tool schema that found nothing: 0.0 for numbers, 'Unknown' for strings
+    if schema.get('type') == 'object':
+        return {name: _zeros(child) for name, child in schema.get('properties', {}).items()}
+    return 0.0 if schema.get('type') == 'number' else 'Unknown'
+
+
+def zero_answer(params):
+    """The message LocalBatches answers a request with: its tool, called with zeros."""
+    tool = params['tools'][0]
+    return {
+        'id': f'msg_local_{uuid.uuid4().hex}',
+        'type': 'message',
+        'role': 'assistant',
+        'model': params['model'],
+        'content': [{'type': 'tool_use', 'id': f'toolu_local_{uuid.uuid4().hex}', 'name': tool['name'],
+                     'input': _zeros(tool['input_schema'])}],
+        'stop_reason': 'tool_use',
+        'stop_sequence': None,
+        'usage': {'input_tokens': 0, 'output_tokens': 0}
+    }
+
+
+class LocalBatches:
+    """Stand-in for client.messages.batches that never leaves the machine.
+
+    Batches are JSON files in directory, so they outlive the process like
+    real ones. A batch is answered the first time it is retrieved, calling
+    respond(params) for each request (zero_answer by default); a respond that
+    raises makes that request 'errored'. Returns the SDK's own types.
+    """
+
+    def __init__(self, directory, respond=zero_answer):
+        self.directory = directory
+        self.respond = respond
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id, suffix):
+        return os.path.join(self.directory, f'{batch_id}{suffix}')
+
+    def _batch(self, batch_id, created, requests, results=None):
+        counts = {'processing': 0, 'succeeded': 0, 'errored': 0, 'canceled': 0, 'expired': 0}
+        if results is None:
+            counts['processing'] = len(requests)
+        else:
+            for result in results:
+                counts[result['result']['type']] += 1
+        created_at = datetime.datetime.fromtimestamp(created, datetime.timezone.utc)
+        return MessageBatch.model_validate({
+            'id': batch_id,
+            'type': 'message_batch',
+            'processing_status': 'in_progress' if results is None else 'ended',
+            'request_counts': counts,
+            'created_at': created_at,
+            'expires_at': created_at + datetime.timedelta(days=1),
+            'ended_at': None if results is None else datetime.datetime.now(datetime.timezone.utc),
+            'archived_at': None,
+            'cancel_initiated_at': None,
+            'results_url': None
+        })
+
+    def create(self, requests):
+        batch_id = f'msgbatch_local_{uuid.uuid4().hex}'
+        created = time.time()
+        requests = list(requests)
+        with open(self._path(batch_id, '.json'), 'w', encoding='utf-8') as f:
+            json.dump({'created': created, 'requests': requests}, f)
+        return self._batch(batch_id, created, requests)
+
+    def retrieve(self, batch_id):
+        with open(self._path(batch_id, '.json'), encoding='utf-8') as f:
+            batch = json.load(f)
+        results_path = self._path(batch_id, '.results.jsonl')
+        if not os.path.exists(results_path):
+            results = []
+            for request in batch['requests']:
+                try:
+                    result = {'type': 'succeeded', 'message': self.respond(request['params'])}
+                except Exception as e:
+                    result = {'type': 'errored', 'error': {'type': 'error', 'error': {'type': 'api_error', 'message': str(e)}}}
+                results.append({'custom_id': request['custom_id'], 'result': result})
+            with open(results_path + '.tmp', 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(result) + '\n' for result in results)
+            os.replace(results_path + '.tmp', results_path)
+        return self._batch(batch_id, batch['created'], batch['requests'], self._results(batch_id))
+
+    def _results(self, batch_id):
+        with open(self._path(batch_id, '.results.jsonl'), encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def results(self, batch_id):
+        return (MessageBatchIndividualResponse.model_validate(result) for result in self._results(batch_id))
+
+
+def pdf_paths(paths):
+    # The PDF files among paths, and in the directories among them
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    if app.allowed_file(name):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def backfill_options():
+    # Backfills send one call per document, whatever the section or chunk settings
+    return app.prompt_options(
+        app.app.config['EXTRACT_STATEMENT_TABLES'], app.app.config['CROP_STATEMENT_PAGES'], single_call=True
+    )
+
+
+def write_result(cache_key, custom_id, entities):
+    # Where an upload of the same file looks for its entities
+    if app.response_cache:
+        app.response_cache.put(custom_id, entities)
+    document = app.extraction_cache.get(cache_key)
+    if document is not None:
+        document.update(entities=entities, model=app.MODEL_NAME, prompt_options=backfill_options())
+        app.extraction_cache.put(cache_key, **document)
+
+
+def prepare(path, engine):
+    """Parse one filing as an upload would; return (custom_id, cache_key, request params), or None.
+
+    None means there is nothing to submit: the file is rejected at preflight
+    or scanned, or its entities are already cached for the current model.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    filename = os.path.basename(path)
+    try:
+        app.check_upload(filename, data)
+    except app.UploadError as e:
+        print(f"Skipping {path}: {e}")
+        return None
+    if app.app.config['SCANNED_DOCUMENTS'] != 'extract' and app.scanned_document_pages(data):
+        print(f"Skipping {path}: scanned document")
+        return None
+    digest = app.bytes_sha256(data)
+    statements_only = app.app.config['LOCATE_STATEMENT_PAGES']
+    until_statements = app.app.config['STOP_AFTER_STATEMENTS']
+    with_tables = app.app.config['EXTRACT_STATEMENT_TABLES']
+    crop_statements = app.app.config['CROP_STATEMENT_PAGES']
+    document = app.extract_document(
+        data,
+        engine,
+        statements_only=statements_only,
+        with_tables=with_tables,
+        digest=digest,
+        until_statements=until_statements,
+        extract_entities=False
+    )
+    if (document.get('entities') is not None and document.get('model') == app.MODEL_NAME
+            and document.get('prompt_options') in (backfill_options(), app.prompt_options(with_tables, crop_statements))):
+        return None
+    cache_key = app.document_cache_key(digest, statements_only, until_statements)
+    pages = app.prompt_pages(data, document, crop_statements, statements_only=statements_only)
+    query = app.extraction_query(pages, document.get('tables') if with_tables else None)
+    custom_id = response_key(app.MODEL_NAME, app.EXTRACTION_TOOLS, app.EXTRACTION_INSTRUCTIONS, query)
+    # The same prompt was answered before (interactively or by another backfill)
+    cached = app.response_cache.get(custom_id) if app.response_cache else None
+    if cached is not None:
+        write_result(cache_key, custom_id, cached)
+        return None
+    return custom_id, cache_key, app.extraction_request(query)
+
+
+def submit(paths, batches, store, engine):
+    """Queue the extraction prompt of every filing in paths; return the number of requests submitted."""
+    submitted = 0
+    pending = []
+    size = 0
+
+    def flush():
+        nonlocal pending, size, submitted
+        if not pending:
+            return
+        # Recorded first, so a crash before the batch exists leaves them 'pending'
+        store.add_pending((request['custom_id'], filename, cache_key) for request, filename, cache_key in pending)
+        batch = batches.create(requests=[request for request, _, _ in pending])
+        store.add_batch(batch.id, [request['custom_id'] for request, _, _ in pending])
+        print(f"Submitted batch {batch.id} with {len(pending)} requests")
+        submitted += len(pending)
+        pending = []
+        size = 0
+
+    queued = set()
+    for path in pdf_paths(paths):
+        prepared = prepare(path, engine)
+        if prepared is None:
+            continue
+        custom_id, cache_key, params = prepared
+        if custom_id in queued or store.status(custom_id) in SUBMITTED_STATUSES:
+            continue
+        request = {'custom_id': custom_id, 'params': params}
+        request_size = len(json.dumps(request))
+        if len(pending) >= app.app.config['BATCH_MAX_REQUESTS'] or size + request_size > MAX_BATCH_BYTES:
+            flush()
+        pending.append((request, os.path.basename(path), cache_key))
+        queued.add(custom_id)
+        size += request_size
+    flush()
+    return submitted
+
+
+def poll(batches, store):
+    """Collect the results of every batch that has ended; return the number of batches still open."""
+    still_open = 0
+    for batch_id in store.open_batches():
+        batch = batches.retrieve(batch_id)
+        if batch.processing_status != 'ended':
+            still_open += 1
+            continue
+        for response in batches.results(batch_id):
+            request = store.request(response.custom_id)
+            if request is None:
+                continue
+            result = response.result
+            if result.type == 'succeeded':
+                entities = app.tool_answer(result.message)
+                if entities:
+                    write_result(request['cache_key'], response.custom_id, entities)
+                    store.finish_request(response.custom_id, 'succeeded')
+                else:
+                    store.finish_request(response.custom_id, 'errored', 'no extraction tool call in the answer')
+            elif result.type == 'errored':
+                store.finish_request(response.custom_id, 'errored', result.error.error.message)
+            else:
+                store.finish_request(response.custom_id, result.type)
+        store.end_batch(batch_id)
+        print(f"Batch {batch_id} ended: {batch.request_counts.model_dump()}")
+    return still_open
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--local', action='store_true', help='use LocalBatches instead of the API')
+    commands = parser.add_subparsers(dest='command', required=True)
+    submit_parser = commands.add_parser('submit', help='parse filings and submit their extraction prompts')
+    submit_parser.add_argument('paths', nargs='+', help='PDF files, or directories searched for them')
+    submit_parser.add_argument('--engine', choices=list(app.ENGINES), default=app.app.config['EXTRACTION_ENGINE'])
+    poll_parser = commands.add_parser('poll', help='write back the results of ended batches')
+    poll_parser.add_argument('--wait', type=float, default=0,
+                             help='poll every this many seconds until every batch has ended')
+    commands.add_parser('status', help='count requests by status')
+    args = parser.parse_args()
+
+    store = BatchStore(app.app.config['BATCH_STORE_PATH'])
+    if args.local:
+        batches = LocalBatches(os.path.join(os.path.dirname(app.app.config['BATCH_STORE_PATH']), 'local-batches'))
+    else:
+        batches = app.client.messages.batches
+    if args.command == 'submit':
+        print(f"Submitted {submit(args.paths, batches, store, args.engine)} requests")
+    elif args.command == 'poll':
+        while poll(batches, store) and args.wait:
+            time.sleep(args.wait)
+    print(f"Requests by status: {store.counts()}")
+
+
+if __name__ == '__main__':
+    main()
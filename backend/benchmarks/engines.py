@@ -0,0 +1,44 @@
+"""Compare the throughput of the text extraction engines.
+
+Run from the backend directory:
+
+    python -m benchmarks.engines path/to/report.pdf [more.pdf ...] [--workers N] [--repeat N]
+"""
+import argparse
+import time
+
+from pdf_extraction import ACCURATE_ENGINE, ENGINES, iter_pdf_pages
+
+
+def time_engine(pdf_paths, engine, workers, repeat):
+    # Best of `repeat` runs, to keep file-cache warmup and noise out of the result
+    best = None
+    for _ in range(repeat):
+        pages = chars = 0
+        start = time.perf_counter()
+        for pdf_path in pdf_paths:
+            for _, text in iter_pdf_pages(pdf_path, workers=workers, engine=engine):
+                pages += 1
+                chars += len(text)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[2]:
+            best = (pages, chars, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdf_paths', nargs='+')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    results = {engine: time_engine(args.pdf_paths, engine, args.workers, args.repeat) for engine in ENGINES}
+    baseline = results[ACCURATE_ENGINE][2]
+    print(f"{'engine':<12}{'pages':>8}{'chars':>12}{'seconds':>10}{'pages/sec':>12}{'speedup':>10}")
+    for engine, (pages, chars, elapsed) in results.items():
+        print(f"{engine:<12}{pages:>8}{chars:>12}{elapsed:>10.2f}{pages / elapsed:>12.1f}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Benchmark text extraction on synthetic reports, and flag regressions.
+
+Generates one synthetic report per --pages/--rows/--layout combination and
+extracts each with every --engines/--workers combination, --repeat times.
+For each case it reports pages/sec, p50/p95 latency per document and peak
+memory growth. With --upload, each document also goes through the /upload
+route (model call stubbed out, caches empty), to measure the whole request.
+
+Every case is appended to --results as a JSON line. A case whose pages/sec
+fell more than --tolerance below its previous result in that file is flagged,
+and the exit status is 1.
+
+Run from the backend directory:
+
+    python -m benchmarks.suite [--pages 20 100] [--rows 15 60] [--layout ruled plain]
+                               [--engines pdfplumber pdfium] [--workers 1 4] [--repeat 3] [--upload]
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import LAYOUTS, synthetic_report
+from pdf_extraction import ENGINES, iter_pdf_pages
+
+DEFAULT_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.jsonl')
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summary(latencies, pages, peaks):
+    latencies = np.array(latencies)
+    return {
+        'pages_per_sec': round(float(pages / latencies.sum()), 2),
+        'p50_seconds': round(float(np.percentile(latencies, 50)), 4),
+        'p95_seconds': round(float(np.percentile(latencies, 95)), 4),
+        'peak_memory_mb': round(max(peaks) / (1024 * 1024), 1),
+    }
+
+
+def run_extraction(pdf_path, engine, workers, repeat):
+    latencies = []
+    peaks = []
+    pages = 0
+    for _ in range(repeat):
+        stats = {}
+        start = time.perf_counter()
+        for _ in iter_pdf_pages(pdf_path, workers=workers, engine=engine, stats=stats):
+            pages += 1
+        latencies.append(time.perf_counter() - start)
+        peaks.append(stats['peak_memory_bytes'])
+    return _summary(latencies, pages, peaks)
+
+
+def _upload_client(tmp_dir):
+    # app reads its configuration at import time: point every cache at tmp_dir
+    # and stub out the model call, which would otherwise dominate the timing
+    os.environ.setdefault('ANTHROPIC_API_KEY', 'benchmark')
+    for key, name in (('EXTRACTION_CACHE_DIR', 'extractions'), ('PAGE_STORE_PATH', 'pages.sqlite3'),
+                      ('TEXT_STORE_DIR', 'text'), ('WORD_STORE_DIR', 'words'),
+                      ('LLM_CACHE_DIR', 'llm'), ('EXTRACTION_TIMINGS_LOG', 'extraction_timings.jsonl')):
+        os.environ[key] = os.path.join(tmp_dir, name)
+    import app
+    app.extract_key_fields = lambda pages, tables=None, stats=None: {}
+    logging.getLogger().setLevel(logging.WARNING)
+    app.app.logger.setLevel(logging.WARNING)
+    return app, app.app.test_client()
+
+
+def run_upload(app, client, data, engine, repeat, tmp_dir):
+    from extraction_cache import ExtractionCache
+    from page_store import PageStore
+
+    latencies = []
+    peaks = []
+    pages = 0
+    for run in range(repeat):
+        # Fresh caches, so every run extracts the document again
+        app.extraction_cache = ExtractionCache(os.path.join(tmp_dir, f'extractions-{run}-{engine}'), 1 << 40)
+        app.page_store = PageStore(os.path.join(tmp_dir, f'pages-{run}-{engine}.sqlite3'), 1 << 40)
+        start = time.perf_counter()
+        response = client.post('/upload', data={'files': (io.BytesIO(data), 'benchmark.pdf'), 'engine': engine})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"/upload failed: {response.get_json()}")
+        stats = response.get_json()[0].get('extraction_stats', {})
+        pages += stats.get('pages', 0)
+        peaks.append(stats.get('peak_memory_mb', 0) * 1024 * 1024)
+    return _summary(latencies, pages, peaks)
+
+
+def _previous_results(path):
+    previous = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    previous[record['case']] = record
+    except FileNotFoundError:
+        pass
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[20, 100])
+    parser.add_argument('--rows', type=int, nargs='+', default=[15])
+    parser.add_argument('--layout', choices=LAYOUTS, nargs='+', default=list(LAYOUTS))
+    parser.add_argument('--engines', choices=list(ENGINES), nargs='+', default=list(ENGINES))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--upload', action='store_true', help='also benchmark the /upload route')
+    parser.add_argument('--results', default=DEFAULT_RESULTS)
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='pages/sec drop, as a fraction of the previous result, that counts as a regression')
+    args = parser.parse_args()
+
+    previous = _previous_results(args.results)
+    revision = _git_revision()
+    regressions = 0
+    print(f"{'case':<72}{'pages/sec':>11}{'p50 s':>9}{'p95 s':>9}{'peak MB':>9}  vs previous")
+    with tempfile.TemporaryDirectory() as tmp_dir, open(args.results, 'a', encoding='utf-8') as results:
+        app = client = None
+        for pages in args.pages:
+            for rows in args.rows:
+                for layout in args.layout:
+                    data = synthetic_report(pages, rows, layout)
+                    pdf_path = os.path.join(tmp_dir, f'report-{pages}-{rows}-{layout}.pdf')
+                    with open(pdf_path, 'wb') as f:
+                        f.write(data)
+                    cases = [
+                        (f'extract pages={pages} rows={rows} layout={layout} engine={engine} workers={workers}',
+                         lambda engine=engine, workers=workers: run_extraction(pdf_path, engine, workers, args.repeat))
+                        for engine in args.engines for workers in args.workers
+                    ]
+                    if args.upload:
+                        if client is None:
+                            app, client = _upload_client(tmp_dir)
+                        cases += [
+                            (f'upload pages={pages} rows={rows} layout={layout} engine={engine}',
+                             lambda engine=engine: run_upload(app, client, data, engine, args.repeat, tmp_dir))
+                            for engine in args.engines
+                        ]
+                    for case, run in cases:
+                        record = {'case': case, 'time': time.time(), 'revision': revision, **run()}
+                        before = previous.get(case)
+                        change = ''
+                        if before:
+                            ratio = record['pages_per_sec'] / before['pages_per_sec'] - 1
+                            record['regression'] = bool(ratio < -args.tolerance)
+                            regressions += record['regression']
+                            change = f"{ratio:+.0%}{'  REGRESSION' if record['regression'] else ''}"
+                        print(f"{case:<72}{record['pages_per_sec']:>11}{record['p50_seconds']:>9}"
+                              f"{record['p95_seconds']:>9}{record['peak_memory_mb']:>9}  {change}")
+                        results.write(json.dumps(record) + '\n')
+    print(f"Peak RSS of the benchmark process: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss >> 10} MB")
+    if regressions:
+        print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Generate synthetic annual-report PDFs for the benchmarks.
+
+The PDF is written by hand (Helvetica text and, for ruled tables, drawn lines)
+so the benchmarks need nothing beyond the backend's own requirements. A
+report has narrative pages with a running header and footer, and a balance
+sheet and income statement in the middle, continued over as many pages as
+their rows need.
+
+Write one from the backend directory:
+
+    python -m benchmarks.synthetic out.pdf [--pages N] [--rows N] [--layout ruled|plain] [--seed N]
+"""
+import argparse
+import random
+
+LAYOUTS = ('ruled', 'plain')
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 72
+LINE_HEIGHT = 14
+ROW_HEIGHT = LINE_HEIGHT + 4
+# Statement rows go down the page to here, which leaves room for the footnotes
+ROWS_BOTTOM = MARGIN + 3 * LINE_HEIGHT
+
+BALANCE_SHEET_LABELS = [
+    'Cash and cash equivalents', 'Accounts receivable', 'Prepaid expenses', 'Inventories',
+    'Property, plant and equipment', 'Accumulated depreciation', 'Investments', 'Goodwill',
+    'Accounts payable', 'Accrued expenses', 'Short-term debt', 'Long-term debt', 'Deferred revenue',
+    'Common stock', 'Retained earnings',
+]
+INCOME_STATEMENT_LABELS = [
+    'Sales revenue', 'Rental income', 'Cost of goods sold', 'Gross profit', 'Operating expenses',
+    'Depreciation', 'Interest expense', 'Other income', 'Income before income taxes', 'Income taxes',
+]
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+class _Page:
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x, y, text, size=10):
+        self.ops.append(f'BT /F1 {size} Tf {x} {y} Td ({_escape(text)}) Tj ET')
+
+    def line(self, x1, y1, x2, y2):
+        self.ops.append(f'{x1} {y1} m {x2} {y2} l S')
+
+    def content(self):
+        return '\n'.join(self.ops).encode('latin-1')
+
+
+def _amount(rng):
+    value = rng.randint(50, 250000)
+    return f'({value:,})' if rng.random() < 0.15 else f'{value:,}'
+
+
+def _page_frame(page, page_number, company):
+    page.text(MARGIN, PAGE_HEIGHT - 40, f'{company} Annual Report 2023', size=9)
+    page.text(PAGE_WIDTH / 2 - 20, 30, f'Page {page_number}', size=9)
+
+
+def _narrative_page(page, rng):
+    y = PAGE_HEIGHT - MARGIN - 20
+    words = ['revenue', 'growth', 'risk', 'market', 'customers', 'operations', 'segment', 'costs',
+             'strategy', 'capital', 'liquidity', 'outlook', 'the', 'and', 'of', 'our', 'in', 'increased']
+    while y > MARGIN:
+        page.text(MARGIN, y, ' '.join(rng.choice(words) for _ in range(14)).capitalize() + '.')
+        y -= LINE_HEIGHT
+
+
+def _statement_rows(labels, rows, total_label):
+    row_labels = [labels[i % len(labels)] + (f' {i // len(labels) + 1}' if i >= len(labels) else '') for i in range(rows)]
+    return row_labels + [total_label]
+
+
+def _statement_page(page, rng, title, row_labels, layout, footnotes):
+    top = PAGE_HEIGHT - MARGIN - 20
+    page.text(MARGIN, top, title, size=12)
+    columns = (MARGIN, 360, 460, PAGE_WIDTH - MARGIN)
+    y = top - 2 * LINE_HEIGHT
+    page.text(columns[1] + 10, y, '2023')
+    page.text(columns[2] + 10, y, '2022')
+    for label in row_labels:
+        y -= ROW_HEIGHT
+        page.text(columns[0] + 4, y, label)
+        page.text(columns[1] + 10, y, _amount(rng))
+        page.text(columns[2] + 10, y, _amount(rng))
+    if layout == 'ruled':
+        table_top = top - 2 * LINE_HEIGHT + LINE_HEIGHT
+        table_bottom = y - 6
+        for x in columns:
+            page.line(x, table_top, x, table_bottom)
+        row_y = table_top
+        while row_y >= table_bottom:
+            page.line(columns[0], row_y, columns[-1], row_y)
+            row_y -= ROW_HEIGHT
+    if not footnotes:
+        return
+    # Footnotes under the table, as real statements have
+    y -= 3 * LINE_HEIGHT
+    for i in range(3):
+        page.text(MARGIN, y - i * LINE_HEIGHT, f'({i + 1}) See the notes to the consolidated financial statements.', size=8)
+
+
+def _statement_pages(title, labels, rows, total_label):
+    # (title, row labels, footnotes) per page of a statement: rows that don't
+    # fit go on continuation pages, and the footnotes follow the total
+    per_page = (PAGE_HEIGHT - MARGIN - 20 - 2 * LINE_HEIGHT - ROWS_BOTTOM) // ROW_HEIGHT
+    row_labels = _statement_rows(labels, rows, total_label)
+    starts = range(0, len(row_labels), per_page)
+    return [
+        (title if start == 0 else f'{title} (continued)', row_labels[start:start + per_page], start == starts[-1])
+        for start in starts
+    ]
+
+
+def synthetic_report(pages=40, rows=15, layout='ruled', seed=0, company='ACME Holdings Inc.'):
+    """Return the bytes of a synthetic annual report.
+
+    pages is the page count; the balance sheet and income statement follow
+    each other from the middle page, each with `rows` line items plus a
+    total, and take a page each unless their rows need more (the page count
+    grows if the statements need more than there are). layout 'ruled' draws
+    table lines, 'plain' aligns columns with whitespace only. The same
+    arguments always give the same bytes.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    statements = (_statement_pages('Consolidated Balance Sheet', BALANCE_SHEET_LABELS, rows, 'Total assets')
+                  + _statement_pages('Consolidated Statement of Income', INCOME_STATEMENT_LABELS, rows, 'Net income'))
+    pages = max(len(statements), pages)
+    rng = random.Random(seed)
+    statements_at = min(pages // 2, pages - len(statements) + 1)
+    contents = []
+    for page_number in range(1, pages + 1):
+        page = _Page()
+        _page_frame(page, page_number, company)
+        if statements_at <= page_number < statements_at + len(statements):
+            title, row_labels, footnotes = statements[page_number - statements_at]
+            _statement_page(page, rng, title, row_labels, layout, footnotes)
+        else:
+            _narrative_page(page, rng)
+        contents.append(page.content())
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream
+    # per page, then the document information dictionary
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        ('<< /Type /Pages /Kids [' + ' '.join(f'{4 + 2 * i} 0 R' for i in range(pages)) + f'] /Count {pages} >>').encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    for i, content in enumerate(contents):
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>'.encode()
+        )
+        objects.append(b'<< /Length ' + str(len(content)).encode() + b' >>\nstream\n' + content + b'\nendstream')
+
+    objects.append(b'<< /Producer (benchmarks.synthetic) >>')
+    info = len(objects)
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode()
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R /Info {info} 0 R >>\n'.encode()
+    out += f'startxref\n{xref}\n%%EOF\n'.encode()
+    return bytes(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out')
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--rows', type=int, default=15)
+    parser.add_argument('--layout', choices=LAYOUTS, default='ruled')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    with open(args.out, 'wb') as f:
+        f.write(synthetic_report(args.pages, args.rows, args.layout, args.seed))
+
+
+if __name__ == '__main__':
+    main()
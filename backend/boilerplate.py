@@ -0,0 +1,85 @@
+import hashlib
+import re
+from collections import Counter
+
+# Rough size of a model token in characters of English prose, for reporting
+# what stripping saved without a round trip to the token counting API
+CHARS_PER_TOKEN = 4
+
+# Running headers and footers sit in this many lines at the top and bottom of a page
+EDGE_LINES = 3
+
+_DIGITS_RE = re.compile(r'\d+')
+_SPACE_RE = re.compile(r'\s+')
+# "Page 3", "Page 3 of 40", "- 3 -", or a bare page number
+_PAGE_NUMBER_RE = re.compile(r'\bpage\s+\d+(?:\s+of\s+\d+)?\b|^[^\w]*\d{1,4}[^\w]*$', re.IGNORECASE)
+
+
+def _line_hash(line, page_number=False):
+    # Digits are masked only in page number lines, so "Page 3 of 40" hashes alike
+    # on every page while "Total assets 12,345" and "Total assets 9,100" differ
+    normalized = line.strip().lower()
+    if page_number:
+        normalized = _DIGITS_RE.sub('#', normalized)
+    normalized = _SPACE_RE.sub(' ', normalized)
+    return hashlib.blake2b(normalized.encode(), digest_size=8).digest() if normalized else None
+
+
+def _line_hashes(text):
+    # (line, hash) for each line of a page; page numbers only count in the header and footer lines
+    lines = text.splitlines()
+    return [
+        (line, _line_hash(line, (index < EDGE_LINES or index >= len(lines) - EDGE_LINES)
+                          and bool(_PAGE_NUMBER_RE.search(line.strip()))))
+        for index, line in enumerate(lines)
+    ]
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def boilerplate_hashes(texts, min_share=0.5, min_pages=4):
+    """Return the hashes of lines repeated on at least min_share of the pages.
+
+    Headers, footers, page numbers and disclaimers repeat on most pages of a
+    report; statement lines do not. Documents of fewer than min_pages pages
+    are too short to tell the two apart, so nothing is returned for them.
+    """
+    if len(texts) < min_pages:
+        return set()
+    counts = Counter()
+    for text in texts:
+        counts.update({line_hash for _, line_hash in _line_hashes(text)} - {None})
+    threshold = max(2, min_share * len(texts))
+    return {line_hash for line_hash, count in counts.items() if count >= threshold}
+
+
+def strip_boilerplate(pages, min_share=0.5, min_pages=4, document_texts=None):
+    """Drop repeated boilerplate lines from (page_number, text) pages.
+
+    Boilerplate is found over document_texts, the text of every page of the
+    document, when pages are only some of them: a handful of selected pages
+    is too few to tell boilerplate from lines that merely repeat between two
+    statements. The first occurrence of each boilerplate line is kept, so the
+    document still names the company and report once. Returns the stripped
+    pages and the list of lines removed.
+    """
+    if document_texts is None:
+        document_texts = [text for _, text in pages]
+    hashes = boilerplate_hashes(document_texts, min_share, min_pages)
+    if not hashes:
+        return list(pages), []
+    seen = set()
+    removed = []
+    stripped = []
+    for page_number, text in pages:
+        kept = []
+        for line, line_hash in _line_hashes(text):
+            if line_hash in hashes and line_hash in seen:
+                removed.append(line)
+                continue
+            seen.add(line_hash)
+            kept.append(line)
+        stripped.append((page_number, '\n'.join(kept)))
+    return stripped, removed
@@ -0,0 +1,82 @@
+from collections import Counter
+
+from boilerplate import CHARS_PER_TOKEN, estimate_tokens
+
+
+def _split_page(text, token_budget):
+    # A page over the budget is cut between lines, and lines over it into slices
+    if estimate_tokens(text) <= token_budget:
+        yield text
+        return
+    max_chars = token_budget * CHARS_PER_TOKEN
+    piece = []
+    size = 0
+    for line in text.split('\n'):
+        for start in range(0, max(len(line), 1), max_chars):
+            part = line[start:start + max_chars]
+            if piece and size + len(part) + 1 > max_chars:
+                yield '\n'.join(piece)
+                piece = []
+                size = 0
+            piece.append(part)
+            size += len(part) + 1
+    if piece:
+        yield '\n'.join(piece)
+
+
+def chunk_pages(pages, token_budget):
+    """Split (page_number, text) pages into runs of at most token_budget estimated tokens.
+
+    Chunks break between pages and keep them in order. Only a page that is
+    over the budget on its own is split, into several (page_number, text)
+    pieces.
+    """
+    chunks = []
+    chunk = []
+    size = 0
+    for page_number, text in pages:
+        for piece in _split_page(text, max(token_budget - 1, 1)):
+            # +1 for the newline that joins pages in the prompt
+            tokens = estimate_tokens(piece) + 1
+            if chunk and size + tokens > token_budget:
+                chunks.append(chunk)
+                chunk = []
+                size = 0
+            chunk.append((page_number, piece))
+            size += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _present(value):
+    # Extraction answers 0.0 (or 'Unknown') for fields it can't find in its chunk
+    return value not in (None, '', 'Unknown') and value != 0
+
+
+def _merge(values):
+    dicts = [value for value in values if isinstance(value, dict)]
+    if dicts:
+        keys = dict.fromkeys(key for value in dicts for key in value)
+        return {key: _merge([value[key] for value in dicts if key in value]) for key in keys}
+    present = [value for value in values if _present(value)]
+    if not present:
+        return values[0] if values else None
+    # The value most chunks agree on; ties go to the earliest chunk
+    counts = Counter(present)
+    first = {}
+    for index, value in enumerate(present):
+        first.setdefault(value, index)
+    return max(counts, key=lambda value: (counts[value], -first[value]))
+
+
+def merge_entities(partials):
+    """Merge the entities extracted from each chunk of a document, in chunk order.
+
+    A statement line is printed in one chunk, so every other chunk reports
+    the field as 0.0: each field takes the value found in the chunks, the
+    one found most often if they disagree, and the earliest of those on a
+    tie. Fields no chunk found keep the first chunk's value. The result only
+    depends on the partials and their order.
+    """
+    return _merge(list(partials))
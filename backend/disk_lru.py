@@ -0,0 +1,74 @@
+"""Entry files shared by the on-disk caches and stores.
+
+Each of them keeps one file (or directory) per entry in a directory. Entries
+are written to a temporary file and renamed into place, so readers never see
+a partial one. File modification times are the LRU clock: reads touch an
+entry, and writes evict the least recently used entries until the directory
+is back within its limits. Uploads are processed on several threads, so any
+entry may be evicted by another thread at any point.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+
+def write_atomic(directory, path, write, binary=False):
+    """Create or replace path (in directory) with what write(f) writes to an open file."""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove(tmp_path)
+        raise
+
+
+def write_json(directory, path, value):
+    write_atomic(directory, path, lambda f: json.dump(value, f))
+
+
+def touch(path):
+    """Mark the entry at path as just used; False if it has been evicted."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def remove(path):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def evict(directory, is_entry, max_bytes=None, max_entries=None):
+    """Remove the least recently used entries of directory until it fits in max_bytes and max_entries.
+
+    is_entry(dirent) picks out the entries among the directory's files.
+    Either limit may be None. A directory entry counts the size of the
+    directory file itself, not of its contents.
+    """
+    entries = []
+    with os.scandir(directory) as it:
+        for dirent in it:
+            if is_entry(dirent):
+                try:
+                    stat = dirent.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, dirent.path))
+    total = sum(size for _, size, _ in entries)
+    count = len(entries)
+    for _, size, path in sorted(entries):
+        if (max_bytes is None or total <= max_bytes) and (max_entries is None or count <= max_entries):
+            break
+        remove(path)
+        total -= size
+        count -= 1
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import logging
+import os
+
+import disk_lru
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ExtractionCache:
+    """On-disk cache of extraction results, keyed by the SHA-256 of the PDF bytes.
+
+    Each entry is one JSON file holding the per-page text plus whatever else
+    the caller stores with it (the engine that extracted the text, the
+    entities and the model that produced them, statement tables). Entries
+    are written and evicted through disk_lru; the cache is kept within
+    max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f'{digest}.json')
+
+    def get(self, digest):
+        path = self._path(digest)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            disk_lru.remove(path)
+            return None
+        disk_lru.touch(path)
+        entry['pages'] = [tuple(page) for page in entry['pages']]
+        return entry
+
+    def put(self, digest, pages, **fields):
+        disk_lru.write_json(self.directory, self._path(digest), {'pages': list(pages), **fields})
+        disk_lru.evict(self.directory, lambda dirent: dirent.name.endswith('.json'), max_bytes=self.max_bytes)
@@ -0,0 +1,96 @@
+import re
+
+import numpy as np
+
+# Numbers as statements print them: '1,234', '(1,234)', '-1,234', '$ 4,500.00',
+# '1.2m', '3 million', and dashes standing for zero
+_TOKEN_RE = re.compile(
+    r'(?<![\w.,])(?P<number>\(?-?\$?\s?\d(?:[\d,]*\d)?(?:\.\d+)?\)?|(?<!\S)[—–-](?!\S))'
+    r'(?:\s?(?P<suffix>thousand|million|billion|bn|k|m|b)\b)?',
+    re.IGNORECASE
+)
+_AMOUNT_RE = re.compile(r'^\(?-?\$?\s*\d[\d,]*(?:\.\d+)?\)?$')
+DASHES = ('-', '–', '—')
+SCALES = {'': 1.0, 'k': 1e3, 'thousand': 1e3, 'm': 1e6, 'million': 1e6, 'b': 1e9, 'bn': 1e9, 'billion': 1e9}
+
+
+def _parse(numbers):
+    # Vectorized over a string array: returns (values, negative), dashes as 0
+    numbers = np.char.strip(np.asarray(numbers, dtype=str))
+    if not numbers.size:
+        return np.zeros(0), np.zeros(0, dtype=bool)
+    dash = np.isin(numbers, DASHES)
+    negative = (np.char.startswith(numbers, '(') | np.char.startswith(numbers, '-')) & ~dash
+    digits = numbers
+    for char in ('(', ')', '-', '$', ',', ' '):
+        digits = np.char.replace(digits, char, '')
+    digits = np.where(dash, '0', digits)
+    values = digits.astype(float)
+    return np.where(negative, -values, values), negative
+
+
+def parse_amounts(cells):
+    """Parse table cells such as '1,234', '(1,234)', '$ 4,500.00' or '—' in one batch.
+
+    Returns a float array with NaN for cells that are not amounts.
+    """
+    cells = [(cell or '').strip() for cell in cells]
+    amounts = np.array([cell in DASHES or bool(_AMOUNT_RE.match(cell)) for cell in cells], dtype=bool)
+    values = np.full(len(cells), np.nan)
+    if amounts.any():
+        values[amounts] = _parse(np.array(cells, dtype=str)[amounts])[0]
+    return values
+
+
+class NumericTokens:
+    """Every numeric token of a document, as parallel NumPy arrays.
+
+    value is the signed number as printed and scale the multiplier of its
+    suffix ('1.2m' has value 1.2 and scale 1e6), so value * scale is the
+    amount; negative marks parentheses or a minus sign. page, offset and
+    length locate the token in its page's text.
+    """
+
+    def __init__(self, pages):
+        numbers = []
+        suffixes = []
+        page_numbers = []
+        offsets = []
+        lengths = []
+        for page_number, text in pages:
+            for match in _TOKEN_RE.finditer(text):
+                numbers.append(match.group('number'))
+                suffixes.append((match.group('suffix') or '').lower())
+                page_numbers.append(page_number)
+                offsets.append(match.start())
+                lengths.append(match.end() - match.start())
+        self.value, self.negative = _parse(numbers)
+        suffixes = np.array(suffixes, dtype=str)
+        unique_suffixes, inverse = np.unique(suffixes, return_inverse=True)
+        self.scale = np.array([SCALES[suffix] for suffix in unique_suffixes])[inverse] if suffixes.size else np.ones(0)
+        self.page = np.array(page_numbers, dtype=np.int32)
+        self.offset = np.array(offsets, dtype=np.int64)
+        self.length = np.array(lengths, dtype=np.int32)
+        self.amount = self.value * self.scale
+
+    def __len__(self):
+        return len(self.value)
+
+    def locate(self, amounts, rel_tol=1e-9, limit=3):
+        """Find where each of the given amounts is printed, ignoring sign.
+
+        Returns one list of {'page', 'offset', 'length'} per amount (at most
+        `limit` each, in document order). An amount matches a token printed
+        either in full or with a scale suffix.
+        """
+        amounts = np.abs(np.asarray(amounts, dtype=float))
+        printed = np.abs(np.stack([self.value, self.amount]))
+        # amounts x tokens, over both readings of each token
+        matches = np.isclose(amounts[:, np.newaxis, np.newaxis], printed[np.newaxis], rtol=rel_tol, atol=0).any(axis=1)
+        return [
+            [
+                {'page': int(self.page[i]), 'offset': int(self.offset[i]), 'length': int(self.length[i])}
+                for i in np.flatnonzero(row)[:limit]
+            ]
+            for row in matches
+        ]
@@ -0,0 +1,141 @@
+import re
+
+import numpy as np
+
+# Phrases that mark the primary statements, with a weight per phrase. Titles
+# and totals weigh most; individual line items also show up in the notes.
+STATEMENT_KEYWORDS = {
+    'balance_sheet': {
+        'balance sheet': 3.0,
+        'balance sheets': 3.0,
+        'statement of financial position': 3.0,
+        'statements of financial position': 3.0,
+        'total assets': 3.0,
+        'total liabilities and equity': 3.0,
+        "total liabilities and stockholders' equity": 3.0,
+        "total liabilities and shareholders' equity": 3.0,
+        'total current assets': 2.0,
+        'total current liabilities': 2.0,
+        'total liabilities': 2.0,
+        'total equity': 2.0,
+        'cash and cash equivalents': 1.0,
+        'accounts receivable': 1.0,
+        'prepaid expenses': 1.0,
+        'property, plant and equipment': 1.0,
+        'accumulated depreciation': 1.0,
+        'accounts payable': 1.0,
+        'accrued expenses': 1.0,
+        'long-term debt': 1.0,
+        'retained earnings': 1.0,
+        'common stock': 1.0,
+    },
+    'income_statement': {
+        'income statement': 3.0,
+        'statement of income': 3.0,
+        'statements of income': 3.0,
+        'statement of operations': 3.0,
+        'statements of operations': 3.0,
+        'statement of earnings': 3.0,
+        'statements of earnings': 3.0,
+        'net income': 3.0,
+        'total revenue': 2.0,
+        'total revenues': 2.0,
+        'gross profit': 2.0,
+        'operating income': 2.0,
+        'income before income taxes': 2.0,
+        'earnings per share': 2.0,
+        'total expenses': 2.0,
+        'cost of goods sold': 2.0,
+        'cost of sales': 2.0,
+        'operating expenses': 1.0,
+        'interest expense': 1.0,
+        'rental income': 1.0,
+        'depreciation': 1.0,
+    },
+}
+STATEMENTS = list(STATEMENT_KEYWORDS)
+
+_KEYWORDS = sorted({keyword for keywords in STATEMENT_KEYWORDS.values() for keyword in keywords})
+_KEYWORD_INDEX = {keyword: i for i, keyword in enumerate(_KEYWORDS)}
+# Longest phrases first, so "total liabilities and equity" is not matched as "total liabilities"
+_KEYWORD_RE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(keyword) for keyword in sorted(_KEYWORDS, key=len, reverse=True)) + r')\b'
+)
+# keywords x statements weight matrix
+_WEIGHTS = np.array(
+    [[STATEMENT_KEYWORDS[statement].get(keyword, 0.0) for statement in STATEMENTS] for keyword in _KEYWORDS]
+)
+
+# Score at which a page counts as part of a statement for until_statements_end:
+# a title or total alone (weight 3) is not enough, since the narrative sections
+# quote totals too
+STATEMENT_PAGE_MIN_SCORE = 6.0
+
+_NUMBER_RE = re.compile(r'\(?-?\$?\d[\d,]*(?:\.\d+)?\)?')
+
+
+def _keyword_presence(texts):
+    presence = np.zeros((len(texts), len(_KEYWORDS)))
+    for row, text in enumerate(texts):
+        for keyword in _KEYWORD_RE.findall(text.lower().replace('’', "'")):
+            presence[row, _KEYWORD_INDEX[keyword]] = 1.0
+    return presence
+
+
+def _numeric_density(texts):
+    numbers = np.array([len(_NUMBER_RE.findall(text)) for text in texts], dtype=float)
+    tokens = np.array([len(text.split()) for text in texts], dtype=float)
+    return np.divide(numbers, tokens, out=np.zeros_like(numbers), where=tokens > 0)
+
+
+def statement_scores(texts):
+    """Score each page for each statement in STATEMENTS.
+
+    Returns a pages x statements array: the summed weights of the statement's
+    keywords found on the page, scaled up by the page's share of numeric
+    tokens so that a statement outranks notes that merely mention its totals.
+    """
+    if not texts:
+        return np.zeros((0, len(STATEMENTS)))
+    return (_keyword_presence(texts) @ _WEIGHTS) * (1.0 + _numeric_density(texts))[:, np.newaxis]
+
+
+def locate_statement_pages(texts, top_k=4, neighbors=1, statement=None):
+    """Return the 1-based positions in texts of the pages most likely to hold the statements.
+
+    (These are page numbers when texts covers the whole document.) Picks
+    the top_k pages by combined statement score, plus `neighbors` pages on
+    either side of each (statements often run over a page break). With
+    statement (one of STATEMENTS), pages are ranked by that statement's
+    score alone. When no page scores at all, nothing is returned.
+    """
+    scores = statement_scores(texts)
+    scores = scores[:, STATEMENTS.index(statement)] if statement else scores.sum(axis=1)
+    if not scores.any():
+        return []
+    top = np.argsort(-scores, kind='stable')[:top_k]
+    top = top[scores[top] > 0]
+    selected = (top[:, np.newaxis] + np.arange(-neighbors, neighbors + 1)).ravel()
+    selected = np.unique(selected[(selected >= 0) & (selected < len(texts))])
+    return (selected + 1).tolist()
+
+
+def until_statements_end(pages, margin=2, min_score=STATEMENT_PAGE_MIN_SCORE):
+    """Pass (page_number, text) pages through until the statements block is over.
+
+    A page belongs to a statement when it scores at least min_score for it.
+    Once every statement in STATEMENTS has been seen, iteration stops after
+    `margin` further pages without any statement page, so the pages after the
+    statements are never asked for. Documents where some statement is never
+    found are passed through to the end.
+    """
+    seen = set()
+    since_statement = 0
+    for page_number, text in pages:
+        yield page_number, text
+        scores = statement_scores([text])[0]
+        found = {statement for statement, score in zip(STATEMENTS, scores) if score >= min_score}
+        seen |= found
+        since_statement = 0 if found else since_statement + 1
+        if len(seen) == len(STATEMENTS) and since_statement >= margin:
+            return
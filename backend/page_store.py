@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    fingerprint TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    fingerprint TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    entities TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+CREATE INDEX IF NOT EXISTS documents_last_used ON documents (last_used);
+"""
+
+# SQLite caps the number of bound parameters per statement
+QUERY_BATCH_SIZE = 500
+
+
+def document_fingerprint(page_fingerprints):
+    return hashlib.sha256(''.join(page_fingerprints).encode()).hexdigest()
+
+
+class PageStore:
+    """SQLite store of page text keyed by page fingerprint.
+
+    Lets a revised upload reuse the text of every page whose content streams
+    did not change, and the entities of a document whose pages all match an
+    earlier one (keyed by the digest of its ordered page fingerprints). Both
+    tables are trimmed to max_pages rows, least recently used first.
+    """
+
+    def __init__(self, path, max_pages):
+        self.path = path
+        self.max_pages = max_pages
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_texts(self, fingerprints):
+        fingerprints = list(set(fingerprints))
+        texts = {}
+        now = time.time()
+        with self._connect() as conn:
+            for start in range(0, len(fingerprints), QUERY_BATCH_SIZE):
+                batch = fingerprints[start:start + QUERY_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                texts.update(conn.execute(
+                    f'SELECT fingerprint, text FROM pages WHERE fingerprint IN ({placeholders})', batch
+                ))
+                conn.execute(f'UPDATE pages SET last_used = ? WHERE fingerprint IN ({placeholders})', [now, *batch])
+        return texts
+
+    def put_texts(self, items):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO pages (fingerprint, text, last_used) VALUES (?, ?, ?)',
+                ((fingerprint, text, now) for fingerprint, text in items)
+            )
+            self._evict(conn, 'pages')
+
+    def get_entities(self, document_fingerprint, model):
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT entities FROM documents WHERE fingerprint = ? AND model = ?', (document_fingerprint, model)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE documents SET last_used = ? WHERE fingerprint = ?', (time.time(), document_fingerprint))
+        return json.loads(row[0])
+
+    def put_entities(self, document_fingerprint, model, entities):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO documents (fingerprint, model, entities, last_used) VALUES (?, ?, ?, ?)',
+                (document_fingerprint, model, json.dumps(entities), time.time())
+            )
+            self._evict(conn, 'documents')
+
+    def _evict(self, conn, table):
+        # Only the rows over the limit are looked up, oldest first through the
+        # last_used index, instead of sorting the whole table on every write
+        (count,) = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()
+        if count <= self.max_pages:
+            return
+        conn.execute(
+            f'DELETE FROM {table} WHERE fingerprint IN '
+            f'(SELECT fingerprint FROM {table} ORDER BY last_used LIMIT ?)',
+            (count - self.max_pages,)
+        )
@@ -0,0 +1,532 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import resource
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+import pdfplumber
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from pdfminer.psparser import PSLiteral
+
+# Each worker gets several small contiguous chunks rather than one big one, so a
+# few slow pages (dense statements, vector graphics) don't leave the others idle
+CHUNKS_PER_WORKER = 4
+
+# With a page timeout, a chunk gets this long on top of its pages' budgets
+# (worker start-up, opening the PDF) before the watchdog gives up on it
+CHUNK_TIMEOUT_SLACK = 5.0
+
+# A fast-engine page is re-extracted with pdfplumber when more than this share
+# of its characters are replacement, control or private-use characters
+GARBLED_CHAR_RATIO = 0.1
+
+# A page with fewer text characters than this, mostly covered by images, is a
+# scan (or a photo) with no text layer to extract
+SCANNED_MAX_CHARS = 20
+SCANNED_MIN_IMAGE_COVERAGE = 0.5
+
+# A page alarm swallowed by the code it interrupted goes off again this often
+PAGE_TIMER_REPEAT_SECONDS = 0.05
+
+# Where each page is, for the watchdog to tell the page a chunk is stuck on
+PAGE_PENDING, PAGE_STARTED, PAGE_DONE = 0, 1, 2
+
+# PDFium is not thread-safe, even across documents, and uploads are handled on
+# several threads: every call into it in this process holds this lock
+PDFIUM_LOCK = threading.Lock()
+
+# Extraction workers are forked from a server process rather than from this
+# one, whose thread pools make forking it unsafe. The server imports this
+# module up front, so workers start with pdfplumber and PDFium loaded.
+_POOL_CONTEXT = multiprocessing.get_context('forkserver')
+_POOL_CONTEXT.set_forkserver_preload([__name__])
+
+
+class MemoryLimitExceeded(Exception):
+    pass
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # No /proc (macOS): settle for the peak RSS, which is in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _MemoryWatch:
+    # Tracks how far RSS grows above its baseline while pages are extracted
+
+    def __init__(self, limit=None, baseline=None):
+        self.limit = limit
+        self.baseline = _rss_bytes() if baseline is None else baseline
+        self.peak = 0
+
+    def check(self, page_number):
+        growth = _rss_bytes() - self.baseline
+        self.peak = max(self.peak, growth)
+        if self.limit and growth > self.limit:
+            raise MemoryLimitExceeded(
+                f"Extraction memory reached {growth >> 20} MB at page {page_number}, "
+                f"over the {self.limit >> 20} MB limit"
+            )
+
+
+def _release_page(pdf, page):
+    # Drop the page's objects and layout, and pdfminer's caches of resolved
+    # objects (decoded content streams included), which would otherwise live
+    # until the whole document is closed
+    page.close()
+    pdf.doc._cached_objs.clear()
+    pdf.doc._parsed_objs.clear()
+
+
+def open_pdfplumber(pdf_path, **kwargs):
+    """pdfplumber.open that also accepts the PDF's bytes in place of a path."""
+    if isinstance(pdf_path, bytes):
+        # BytesIO shares the bytes object instead of copying it
+        pdf_path = io.BytesIO(pdf_path)
+    return pdfplumber.open(pdf_path, **kwargs)
+
+
+class _PdfplumberEngine:
+    # pdfplumber's layout analysis: slow, but keeps reading order and spacing
+
+    def __init__(self, pdf_path, page_numbers, low_memory=False):
+        self.pdf = open_pdfplumber(pdf_path, pages=page_numbers)
+        self.pages = {page.page_number: page for page in self.pdf.pages}
+        self.low_memory = low_memory
+
+    def page_text(self, page_number):
+        page = self.pages[page_number]
+        try:
+            return page.extract_text() or ""
+        finally:
+            if self.low_memory:
+                _release_page(self.pdf, page)
+
+    def close(self):
+        self.pdf.close()
+
+
+class _PdfiumEngine:
+    # PDFium's text API (pdfplumber already depends on pypdfium2): no layout
+    # analysis, typically one to two orders of magnitude faster. Pages are
+    # always closed after use, so low_memory changes nothing here.
+
+    def __init__(self, pdf_path, page_numbers, low_memory=False):
+        # PDFium loads bytes in place, without a copy
+        with PDFIUM_LOCK:
+            self.pdf = pdfium.PdfDocument(pdf_path)
+
+    def page_text(self, page_number):
+        with PDFIUM_LOCK:
+            page = self.pdf[page_number - 1]
+            textpage = page.get_textpage()
+            try:
+                return textpage.get_text_range().replace('\r\n', '\n')
+            finally:
+                textpage.close()
+                page.close()
+
+    def close(self):
+        with PDFIUM_LOCK:
+            self.pdf.close()
+
+
+ACCURATE_ENGINE = 'pdfplumber'
+FAST_ENGINE = 'pdfium'
+ENGINES = {
+    ACCURATE_ENGINE: _PdfplumberEngine,
+    FAST_ENGINE: _PdfiumEngine,
+}
+
+
+def _looks_garbled(text):
+    if not text.strip():
+        return True
+    bad = sum(
+        1 for char in text
+        if char == '\ufffd' or '\ue000' <= char <= '\uf8ff' or (char < ' ' and char not in '\n\t')
+    )
+    return bad > GARBLED_CHAR_RATIO * len(text)
+
+
+class PageTimeout(Exception):
+    pass
+
+
+class _PageTimer:
+    # SIGALRM interrupts pure-Python parsing (pdfplumber/pdfminer). Signals can
+    # only be handled on the main thread, i.e. in worker processes. pdfplumber
+    # re-wraps exceptions raised while parsing, and logging swallows those
+    # raised inside a log call (pdfminer logs a lot at DEBUG), so the alarm
+    # repeats until it gets through and callers check `expired` rather than
+    # catching PageTimeout.
+
+    def __init__(self, seconds):
+        self.seconds = seconds if threading.current_thread() is threading.main_thread() else None
+        self.expired = False
+        self.armed = False
+
+    def _expire(self, signum, frame):
+        if self.armed:
+            self.expired = True
+            raise PageTimeout()
+
+    def __enter__(self):
+        if self.seconds:
+            self.armed = True
+            self.previous_handler = signal.signal(signal.SIGALRM, self._expire)
+            signal.setitimer(signal.ITIMER_REAL, self.seconds, PAGE_TIMER_REPEAT_SECONDS)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.seconds:
+            self.armed = False
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous_handler)
+
+
+def _iter_engine_pages(pdf_path, page_numbers, engine, fallback=True, low_memory=False, watch=None,
+                       page_timeout=None, deadline=None, progress=None):
+    # Yields (page_number, text, seconds, skip_reason). Pages that run past
+    # page_timeout, or start after the document's deadline, come back empty
+    # with a skip_reason instead of text. progress, if given, is indexed by
+    # page number and set to PAGE_STARTED and PAGE_DONE as pages go.
+    fallback = fallback and engine != ACCURATE_ENGINE
+    document = ENGINES[engine](pdf_path, page_numbers, low_memory)
+    accurate_document = None
+    try:
+        for page_number in page_numbers:
+            if deadline is not None and time.time() > deadline:
+                yield page_number, "", 0.0, 'document_timeout'
+                continue
+            if progress is not None:
+                progress[page_number] = PAGE_STARTED
+            start = time.perf_counter()
+            timer = _PageTimer(page_timeout)
+            try:
+                with timer:
+                    text = document.page_text(page_number)
+                    # Pages the fast engine returns empty or garbled are redone with pdfplumber
+                    if fallback and _looks_garbled(text):
+                        if accurate_document is None:
+                            accurate_document = _PdfplumberEngine(pdf_path, page_numbers, low_memory)
+                        text = accurate_document.page_text(page_number)
+            except Exception:
+                if not timer.expired:
+                    raise
+            if progress is not None:
+                progress[page_number] = PAGE_DONE
+            # The page may have run on to the end after its alarm was swallowed
+            if timer.expired:
+                yield page_number, "", time.perf_counter() - start, 'page_timeout'
+                continue
+            seconds = time.perf_counter() - start
+            if watch is not None:
+                watch.check(page_number)
+            yield page_number, text, seconds, None
+    finally:
+        document.close()
+        if accurate_document is not None:
+            accurate_document.close()
+
+
+_worker_rss_baseline = None
+_worker_pdf = None
+_worker_progress = None
+
+
+def _init_worker(pdf_path, progress=None):
+    # The PDF (a path, or its bytes) is handed over once per worker rather
+    # than once per chunk
+    global _worker_rss_baseline, _worker_pdf, _worker_progress
+    _worker_pdf = pdf_path
+    _worker_progress = progress
+    _worker_rss_baseline = _rss_bytes()
+
+
+def _extract_page_texts(page_numbers, engine, memory_limit, options):
+    # Runs in a worker process; page_numbers are 1-based. Memory is measured
+    # from the fresh worker, so it covers everything this job put in it.
+    watch = _MemoryWatch(memory_limit, _worker_rss_baseline)
+    pages = list(_iter_engine_pages(_worker_pdf, page_numbers, engine, watch=watch, progress=_worker_progress,
+                                    **options))
+    return pages, os.getpid(), watch.peak
+
+
+def _terminate_workers(executor):
+    # A page stuck in C code never sees its alarm, and ProcessPoolExecutor has
+    # no public way to stop a running task
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+
+
+def _split_pages(page_numbers, chunk_count):
+    chunk_size = -(-len(page_numbers) // chunk_count)
+    return [page_numbers[start:start + chunk_size] for start in range(0, len(page_numbers), chunk_size)]
+
+
+def _object_digest(obj, memo):
+    # Digest of a PDF object and everything it references. Indirect objects
+    # are hashed once per document (fonts and forms are shared by many pages);
+    # a reference back to an object being hashed stands for itself.
+    if isinstance(obj, PDFObjRef):
+        if obj.objid not in memo:
+            memo[obj.objid] = f'ref {obj.objid}'.encode()
+            memo[obj.objid] = _object_digest(resolve1(obj), memo)
+        return memo[obj.objid]
+    digest = hashlib.sha256(type(obj).__name__.encode())
+    if isinstance(obj, PDFStream):
+        digest.update(_object_digest(obj.attrs, memo))
+        digest.update(obj.get_rawdata() or obj.get_data())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=str):
+            # Parent leads back up the page tree, not to anything the page draws with
+            if key != 'Parent':
+                digest.update(str(key).encode() + b'\0' + _object_digest(obj[key], memo))
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            digest.update(_object_digest(item, memo))
+    elif isinstance(obj, PSLiteral):
+        digest.update(str(obj.name).encode())
+    else:
+        digest.update(repr(obj).encode())
+    return digest.digest()
+
+
+def page_fingerprints(pdf_path):
+    """Return a SHA-256 hex digest per page, in page order.
+
+    The digest covers the page's MediaBox, its raw (still encoded) content
+    streams and the resources they draw with, resolved recursively: fonts with
+    their encodings and ToUnicode maps, form and image XObjects. The same
+    glyph codes under a different font map are different text, so pages only
+    share a fingerprint when everything that decides their text is the same.
+    This only requires reading objects, not laying out text, so it is cheap
+    next to extraction.
+    """
+    fingerprints = []
+    memo = {}
+    with open_pdfplumber(pdf_path) as pdf:
+        for page in pdf.pages:
+            digest = hashlib.sha256(repr(page.page_obj.mediabox).encode())
+            for stream in page.page_obj.contents:
+                stream = resolve1(stream)
+                if isinstance(stream, PDFStream):
+                    digest.update(stream.get_rawdata() or stream.get_data())
+            digest.update(_object_digest(page.page_obj.resources or {}, memo))
+            fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def page_count(pdf_path):
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+def _image_coverage(page):
+    # Share of the page area under image objects (overlaps counted twice, so capped at 1)
+    page_width, page_height = page.get_size()
+    covered = 0.0
+    for image in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]):
+        left, bottom, right, top = image.get_bounds()
+        width = min(right, page_width) - max(left, 0.0)
+        height = min(top, page_height) - max(bottom, 0.0)
+        if width > 0 and height > 0:
+            covered += width * height
+    return min(1.0, covered / (page_width * page_height)) if page_width and page_height else 0.0
+
+
+def scan_profile(pdf_path):
+    """Classify each page as text or scanned, from its character count and image coverage.
+
+    Returns one {'page', 'chars', 'image_coverage', 'scanned'} dict per page.
+    Uses PDFium without laying out any text, so it costs a fraction of an
+    extraction.
+    """
+    profile = []
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    chars = len(''.join(textpage.get_text_range().split()))
+                    coverage = _image_coverage(page)
+                finally:
+                    textpage.close()
+                    page.close()
+                profile.append({
+                    'page': index + 1,
+                    'chars': chars,
+                    'image_coverage': round(coverage, 3),
+                    'scanned': chars < SCANNED_MAX_CHARS and coverage >= SCANNED_MIN_IMAGE_COVERAGE
+                })
+        finally:
+            pdf.close()
+    return profile
+
+
+def iter_pdf_pages(pdf_path, workers=1, min_pages_for_parallel=16, page_numbers=None, engine=ACCURATE_ENGINE,
+                   fallback=True, low_memory=False, memory_limit=None, page_timeout=None, document_timeout=None,
+                   stats=None):
+    """Yield (page_number, text) for the pages of pdf_path, in page order.
+
+    pdf_path may also be the PDF's bytes, e.g. an upload that has not been
+    written to disk; both engines parse them in place.
+    page_numbers (1-based) restricts parsing to those pages; by default every
+    page is parsed. engine is a key of ENGINES; unless fallback is False, the
+    fast engine falls back to pdfplumber for pages it cannot read. Pages are
+    yielded as soon as they are parsed, so callers never need to hold more
+    than they choose to keep. When at least min_pages_for_parallel pages are
+    requested they are split into chunks and parsed across a pool of
+    `workers` processes; otherwise (or with workers <= 1) they are parsed in
+    the calling process. Closing the generator early cancels any chunks that
+    have not started yet.
+
+    low_memory releases each page's parsed objects and layout as soon as its
+    text is out, instead of when the document is closed. memory_limit (bytes)
+    caps how much the job may grow RSS, split evenly between workers; going
+    over raises MemoryLimitExceeded. RSS is per process, and the calling
+    process may be extracting other documents in other threads, so a
+    memory_limit also moves extraction into the pool, whatever the page count.
+
+    page_timeout and document_timeout (seconds) bound the time spent on one
+    page and on the whole job. Pages over budget are yielded with empty text
+    and listed in stats['skipped_pages'] instead of blocking. Enforcing them
+    needs a watchdog process, so any timeout moves extraction into the pool,
+    whatever the page count. A page stuck in C code never sees its alarm:
+    a chunk that outlives its pages' budgets has its workers killed and the
+    page it was stuck on skipped, and the rest of it (and the chunks the
+    killed workers were on) is parsed again in a fresh pool.
+
+    If a stats dict is given it receives 'peak_memory_bytes' (the job's peak
+    RSS growth, summed over worker processes; in the calling process, growth
+    from other threads counts too), 'page_seconds' ({page_number:
+    seconds}), 'skipped_pages' ({page_number: reason}) and 'seconds' (wall
+    time of the job).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown extraction engine: {engine}")
+    if stats is None:
+        stats = {}
+    stats.update(page_seconds={}, skipped_pages={})
+    started = time.time()
+    deadline = started + document_timeout if document_timeout else None
+    options = {'fallback': fallback, 'low_memory': low_memory, 'page_timeout': page_timeout, 'deadline': deadline}
+
+    def record(page_number, text, seconds, skip_reason):
+        stats['page_seconds'][page_number] = seconds
+        if skip_reason:
+            stats['skipped_pages'][page_number] = skip_reason
+        return page_number, text
+
+    if page_numbers is None:
+        page_numbers = list(range(1, page_count(pdf_path) + 1))
+    # Timeouts need a watchdog, and memory limits a process of the job's own
+    isolated = page_timeout or document_timeout or memory_limit
+    if not isolated and (workers <= 1 or len(page_numbers) < min_pages_for_parallel):
+        watch = _MemoryWatch(memory_limit)
+        try:
+            for page in _iter_engine_pages(pdf_path, page_numbers, engine, watch=watch, **options):
+                yield record(*page)
+        finally:
+            stats['peak_memory_bytes'] = watch.peak
+            stats['seconds'] = time.time() - started
+        return
+
+    workers = max(1, min(workers, len(page_numbers)))
+    worker_memory_limit = memory_limit // workers if memory_limit else None
+    chunks = _split_pages(page_numbers, min(len(page_numbers), workers * CHUNKS_PER_WORKER)) if page_numbers else []
+    worker_peaks = {}
+    # Futures by chunk (as a tuple), and the one-page chunks a watchdog gave up on
+    futures = {}
+    stuck = set()
+    progress = _POOL_CONTEXT.RawArray('b', max(page_numbers) + 1) if page_timeout and page_numbers else None
+    executor = None
+
+    def start_pool(first):
+        # Chunks from `first` on that have no result yet are (re)submitted to
+        # a fresh pool; those a killed pool had finished keep their results
+        nonlocal executor
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=_POOL_CONTEXT, initializer=_init_worker,
+                                       initargs=(pdf_path, progress))
+        for chunk in map(tuple, chunks[first:]):
+            future = futures.get(chunk)
+            if chunk in stuck:
+                continue
+            if (future is None or future.cancelled() or not future.done()
+                    or isinstance(future.exception(), BrokenProcessPool)):
+                if progress is not None:
+                    for page_number in chunk:
+                        progress[page_number] = PAGE_PENDING
+                futures[chunk] = executor.submit(_extract_page_texts, list(chunk), engine, worker_memory_limit, options)
+
+    try:
+        start_pool(0)
+        # Waiting on the futures in submission order keeps the output in page
+        # order. Chunks are started in that order too, so by the time the
+        # ones before it are done a chunk is running.
+        index = 0
+        while index < len(chunks):
+            chunk = chunks[index]
+            index += 1
+            if tuple(chunk) in stuck:
+                yield record(chunk[0], "", 0.0, 'page_timeout')
+                continue
+            limits = []
+            if deadline:
+                # Workers stop starting pages at the deadline; give a chunk caught
+                # mid-page one more page budget before the watchdog kills it
+                limits.append((max(0.0, deadline - time.time()) + (page_timeout or 1.0), 'document_timeout'))
+            if page_timeout:
+                limits.append((len(chunk) * page_timeout + CHUNK_TIMEOUT_SLACK, 'page_timeout'))
+            timeout, reason = min(limits) if limits else (None, None)
+            try:
+                pages, pid, peak = futures[tuple(chunk)].result(timeout=timeout)
+            except FuturesTimeout:
+                _terminate_workers(executor)
+                if reason == 'document_timeout':
+                    for page_number in (n for remaining in chunks[index - 1:] for n in remaining):
+                        yield record(page_number, "", 0.0, reason)
+                    break
+                executor.shutdown(wait=True, cancel_futures=True)
+                # Only the page the chunk is stuck on is skipped. One that never
+                # got to a page (stuck opening the PDF) is skipped whole.
+                running = [position for position, page_number in enumerate(chunk)
+                           if progress[page_number] == PAGE_STARTED]
+                if running:
+                    position = running[0]
+                    parts = [chunk[:position], chunk[position:position + 1], chunk[position + 1:]]
+                    stuck.add(tuple(parts[1]))
+                    chunks[index - 1:index] = [part for part in parts if part]
+                else:
+                    stuck.update((page_number,) for page_number in chunk)
+                    chunks[index - 1:index] = [[page_number] for page_number in chunk]
+                index -= 1
+                start_pool(index)
+                continue
+            worker_peaks[pid] = max(worker_peaks.get(pid, 0), peak)
+            for page in pages:
+                yield record(*page)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        stats['peak_memory_bytes'] = sum(worker_peaks.values())
+        stats['seconds'] = time.time() - started
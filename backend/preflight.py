@@ -0,0 +1,64 @@
+import re
+
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+
+from pdf_extraction import PDFIUM_LOCK
+
+# The header must start within the first KB and %%EOF end within the last KB
+# (readers tolerate a little junk around both); a linearization dictionary, if
+# any, is the first object in the file
+HEAD_BYTES = 1024
+TAIL_BYTES = 1024
+
+_HEADER_RE = re.compile(rb'%PDF-(\d\.\d)')
+_PRODUCER_MAX_CHARS = 200
+
+
+class PreflightError(Exception):
+    pass
+
+
+def preflight(data):
+    """Check a PDF's bytes cheaply, before any page is parsed.
+
+    Reads the header, the trailer and (through PDFium) the cross-reference
+    table only. Returns {'bytes', 'version', 'pages', 'encrypted',
+    'linearized', 'producer'}; raises PreflightError for payloads that are not
+    PDFs, are truncated or damaged, need a password, or have no pages.
+    Encrypted files that open without a password (owner password only) pass.
+    """
+    head = data[:HEAD_BYTES]
+    header = _HEADER_RE.search(head)
+    if header is None:
+        raise PreflightError("not a PDF (no %PDF- header)")
+    tail = data[-TAIL_BYTES:]
+    if b'%%EOF' not in tail:
+        raise PreflightError("truncated PDF (no %%EOF marker at the end)")
+
+    with PDFIUM_LOCK:
+        try:
+            pdf = pdfium.PdfDocument(data)
+        except pdfium.PdfiumError as e:
+            if getattr(e, 'err_code', None) == pdfium_c.FPDF_ERR_PASSWORD:
+                raise PreflightError("encrypted PDF that needs a password")
+            raise PreflightError(f"damaged PDF ({e})")
+        try:
+            pages = len(pdf)
+            # -1 without a security handler, wherever the trailer that names it is
+            # (linearized files keep theirs at the front)
+            encrypted = pdfium_c.FPDF_GetSecurityHandlerRevision(pdf.raw) != -1
+            producer = (pdf.get_metadata_value('Producer') or '')[:_PRODUCER_MAX_CHARS]
+        finally:
+            pdf.close()
+    if not pages:
+        raise PreflightError("PDF has no pages")
+
+    return {
+        'bytes': len(data),
+        'version': header.group(1).decode(),
+        'pages': pages,
+        'encrypted': encrypted,
+        'linearized': b'/Linearized' in head,
+        'producer': producer,
+    }
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import disk_lru
+
+logger = logging.getLogger(__name__)
+
+_SPACE_RE = re.compile(r'[ \t]+')
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def response_key(model, tools, prompt_template, text):
+    """Cache key of a model response.
+
+    Covers the model name, the tools schema, the prompt template and the
+    variable text sent with it (whitespace-normalized, so re-extractions that
+    only differ in spacing still hit). Changing any of them changes the key.
+    """
+    normalized = '\n'.join(_SPACE_RE.sub(' ', line).strip() for line in text.splitlines())
+    parts = [model, _sha256(json.dumps(tools, sort_keys=True)), _sha256(prompt_template), _sha256(normalized)]
+    return _sha256('\n'.join(parts))
+
+
+class MemoryTier:
+    """In-process LRU of at most max_entries responses, each kept at most ttl seconds (0 = no expiry)."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries, ttl=0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if self.ttl and time.time() - created > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, created=None):
+        with self.lock:
+            self.entries[key] = (created or time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def size(self):
+        return len(self.entries)
+
+
+class DiskTier:
+    """One JSON file per response in directory, kept at most ttl seconds (0 = no expiry).
+
+    Entries are written and evicted through disk_lru; the tier is kept
+    within max_bytes.
+    """
+
+    name = 'disk'
+
+    def __init__(self, directory, max_bytes, ttl=0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable response cache entry {path}: {e}")
+            disk_lru.remove(path)
+            return None
+        if self.ttl and time.time() - entry['created'] > self.ttl:
+            disk_lru.remove(path)
+            return None
+        disk_lru.touch(path)
+        return entry['value']
+
+    def put(self, key, value, created=None):
+        disk_lru.write_json(self.directory, self._path(key), {'created': created or time.time(), 'value': value})
+        disk_lru.evict(self.directory, self._is_entry, max_bytes=self.max_bytes)
+
+    def size(self):
+        with os.scandir(self.directory) as it:
+            return sum(1 for dirent in it if self._is_entry(dirent))
+
+    @staticmethod
+    def _is_entry(dirent):
+        return dirent.name.endswith('.json')
+
+
+class ResponseCache:
+    """Model responses in a chain of tiers (e.g. MemoryTier then DiskTier).
+
+    Lookups try the tiers in order and copy a hit into the faster tiers in
+    front of it; writes go to every tier. Any object with get(key),
+    put(key, value), size() and a name can be a tier. Hits per tier and
+    misses are counted for stats().
+    """
+
+    def __init__(self, tiers):
+        self.tiers = tiers
+        self.hits = {tier.name: 0 for tier in tiers}
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:index]:
+                    faster.put(key, value)
+                with self.lock:
+                    self.hits[tier.name] += 1
+                return value
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        for tier in self.tiers:
+            tier.put(key, value)
+
+    def stats(self):
+        with self.lock:
+            hits = dict(self.hits)
+            misses = self.misses
+        lookups = sum(hits.values()) + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(sum(hits.values()) / lookups, 3) if lookups else None,
+            'entries': {tier.name: tier.size() for tier in self.tiers},
+        }
@@ -0,0 +1,180 @@
+import math
+import re
+from collections import Counter
+
+from numeric_tokens import parse_amounts
+from pdf_extraction import open_pdfplumber
+
+# Ruled tables are found from their drawn lines; statements laid out with
+# whitespace only need pdfplumber's text-alignment strategy instead
+LINE_TABLE_SETTINGS = {'vertical_strategy': 'lines', 'horizontal_strategy': 'lines'}
+TEXT_TABLE_SETTINGS = {'vertical_strategy': 'text', 'horizontal_strategy': 'text'}
+
+# Room kept around a page's tables when cropping to them (points): above, for
+# the statement's title and period headings, and on the other sides
+REGION_TITLE_MARGIN = 72
+REGION_PADDING = 6
+
+_YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+_LETTER_RE = re.compile(r'[^\W\d_]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def parse_amount(cell):
+    """Parse a statement cell such as '1,234', '(1,234)', '$ 4,500.00' or '—'.
+
+    Returns a float, or None when the cell is not an amount.
+    """
+    value = parse_amounts([cell])[0]
+    return None if math.isnan(value) else float(value)
+
+
+def _periods(header_rows, column_count):
+    # Headers are often split across cells ('20', '23 202', '2'), so also try
+    # the row glued back together
+    for row in reversed(header_rows):
+        for joined in (' '.join(row), ''.join(row)):
+            years = _YEAR_RE.findall(joined)
+            if len(years) == column_count:
+                return years
+    return [f'column_{i + 1}' for i in range(column_count)]
+
+
+def _parse_table(table, label_text=None):
+    # label_text(row_index, column_indices), if given, returns the text under
+    # those cells of a row laid out as one string: tables found by text
+    # alignment split labels across cells, often mid-word
+    rows = []
+    header_rows = []
+    table = [[(cell or '').replace('\n', ' ').strip() for cell in raw_row] for raw_row in table]
+    # Parse every cell of the table in one batch; NaN marks cells that are not amounts
+    parsed = parse_amounts([cell for cells in table for cell in cells])
+    values_by_row = []
+    start = 0
+    for cells in table:
+        values_by_row.append(parsed[start:start + len(cells)].tolist())
+        start += len(cells)
+    # The amount columns start where most rows' first amount is: a number
+    # before that ('Cost of goods sold 2') is part of the label
+    first_amounts = Counter(
+        next((i for i, (cell, value) in enumerate(zip(cells, values)) if cell and not math.isnan(value)), None)
+        for cells, values in zip(table, values_by_row)
+    )
+    first_amounts.pop(None, None)
+    if not first_amounts:
+        return None
+    value_start = max(first_amounts, key=lambda column: (first_amounts[column], -column))
+    for row_index, (cells, values) in enumerate(zip(table, values_by_row)):
+        if not any(cells):
+            continue
+        if not rows and _YEAR_RE.search(''.join(cells)):
+            # Period headings come before the first line item
+            header_rows.append(cells)
+            continue
+        first_amount = next(
+            (i for i, (cell, value) in enumerate(zip(cells, values)) if i >= value_start and cell and not math.isnan(value)),
+            None
+        )
+        if first_amount is None:
+            if not rows:
+                header_rows.append(cells)
+            continue
+        # The label is every cell left of the first amount
+        label_columns = [i for i in range(first_amount) if cells[i]]
+        if label_text and label_columns:
+            label = label_text(row_index, label_columns)
+        else:
+            label = ' '.join(cells[i] for i in label_columns)
+        label = _SPACE_RE.sub(' ', label).strip()
+        amounts = [value for cell, value in zip(cells[first_amount:], values[first_amount:]) if cell and not math.isnan(value)]
+        # Rows without a word for a label are footnote markers and stray numbers
+        if _LETTER_RE.search(label):
+            rows.append({'label': label, 'values': amounts})
+        elif not rows and not label:
+            header_rows.append(cells)
+    if not rows:
+        return None
+    column_count = max(len(row['values']) for row in rows)
+    return {'periods': _periods(header_rows, column_count), 'rows': rows}
+
+
+def extract_statement_tables(pdf_path, page_numbers):
+    """Extract label/value rows from the tables on the given (1-based) pages.
+
+    Returns a list of {'page', 'periods', 'rows'} dicts, one per table with at
+    least one row that has a text label and numeric values. Each row is
+    {'label': str, 'values': [float, ...]}, values in period order.
+    """
+    tables = []
+    if not page_numbers:
+        return tables
+    with open_pdfplumber(pdf_path, pages=list(page_numbers)) as pdf:
+        for page in pdf.pages:
+            found = page.find_tables(LINE_TABLE_SETTINGS) or page.find_tables(TEXT_TABLE_SETTINGS)
+            for found_table in found:
+
+                def label_text(row_index, columns, found_table=found_table, page=page):
+                    boxes = [found_table.rows[row_index].cells[i] for i in columns]
+                    boxes = [box for box in boxes if box]
+                    return page.crop((
+                        min(box[0] for box in boxes), min(box[1] for box in boxes),
+                        max(box[2] for box in boxes), max(box[3] for box in boxes)
+                    )).extract_text()
+
+                table = _parse_table(found_table.extract(), label_text)
+                if table:
+                    tables.append({'page': page.page_number, **table})
+            page.close()
+    return tables
+
+
+def statement_region(page):
+    """Return the bounding box of the tables on a pdfplumber page, or None if it has none.
+
+    The box is widened by REGION_TITLE_MARGIN above (statement titles and
+    period headings sit just over the table) and REGION_PADDING elsewhere.
+    """
+    tables = page.find_tables(LINE_TABLE_SETTINGS) or page.find_tables(TEXT_TABLE_SETTINGS)
+    if not tables:
+        return None
+    x0, top, x1, bottom = page.bbox
+    return (
+        max(x0, min(table.bbox[0] for table in tables) - REGION_PADDING),
+        max(top, min(table.bbox[1] for table in tables) - REGION_TITLE_MARGIN),
+        min(x1, max(table.bbox[2] for table in tables) + REGION_PADDING),
+        min(bottom, max(table.bbox[3] for table in tables) + REGION_PADDING),
+    )
+
+
+def extract_statement_regions(pdf_path, page_numbers):
+    """Extract the text of only the table region of each of the given (1-based) pages.
+
+    Returns (page_number, text) pairs; pages without a table are left out.
+    Charts, sidebars and footnotes outside the region are left out of the
+    text. Finding the tables lays out the whole page, and the crop filters
+    its objects, so this costs more than extracting the page in full.
+    """
+    regions = []
+    if not page_numbers:
+        return regions
+    with open_pdfplumber(pdf_path, pages=list(page_numbers)) as pdf:
+        for page in pdf.pages:
+            bbox = statement_region(page)
+            if bbox:
+                regions.append((page.page_number, page.crop(bbox).extract_text() or ''))
+            page.close()
+    return regions
+
+
+def _format_value(value):
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def format_statement_tables(tables):
+    """Render tables as compact pipe-separated text for the prompt."""
+    lines = []
+    for table in tables:
+        lines.append(f"[page {table['page']}] label | {' | '.join(table['periods'])}")
+        for row in table['rows']:
+            lines.append(f"{row['label']} | {' | '.join(_format_value(value) for value in row['values'])}")
+    return '\n'.join(lines)
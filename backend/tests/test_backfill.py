@@ -0,0 +1,86 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+# app reads its configuration when imported: keep every store in a scratch directory
+_tmp_dir = tempfile.TemporaryDirectory()
+for name, path in [('EXTRACTION_CACHE_DIR', 'extractions'), ('PAGE_STORE_PATH', 'pages.sqlite3'),
+                   ('TEXT_STORE_DIR', 'text'), ('WORD_STORE_DIR', 'words'), ('LLM_CACHE_DIR', 'llm'),
+                   ('EXTRACTION_TIMINGS_LOG', 'extraction_timings.jsonl')]:
+    os.environ[name] = os.path.join(_tmp_dir.name, path)
+os.environ.setdefault('ANTHROPIC_API_KEY', 'test')
+
+import app  # noqa: E402
+import backfill  # noqa: E402
+from backfill import BatchStore, LocalBatches, poll, submit  # noqa: E402
+from benchmarks.synthetic import synthetic_report  # noqa: E402
+
+
+def tearDownModule():
+    _tmp_dir.cleanup()
+
+
+def refuse(params):
+    raise RuntimeError('overloaded')
+
+
+class BackfillTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.directory = tmp_dir.name
+        self.store = BatchStore(os.path.join(self.directory, 'batches.sqlite3'))
+        # Each test submits a filing of its own, so nothing is cached by another test
+        self.data = synthetic_report(pages=4, company=self.id())
+        self.filings = os.path.join(self.directory, 'filings')
+        os.makedirs(self.filings)
+        with open(os.path.join(self.filings, 'report.pdf'), 'wb') as f:
+            f.write(self.data)
+        self.cache_key = app.document_cache_key(app.bytes_sha256(self.data))
+
+    def run_backfill(self, function, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function(*args)
+
+    def submit(self, batches):
+        return self.run_backfill(submit, [self.filings], batches, self.store, 'pdfium')
+
+    def test_submit_then_poll_writes_entities_back(self):
+        batches = LocalBatches(os.path.join(self.directory, 'local-batches'))
+        self.assertEqual(self.submit(batches), 1)
+        self.assertEqual(self.store.counts(), {'submitted': 1})
+        self.assertEqual(len(self.store.open_batches()), 1)
+        # The text is cached at submit, the entities only once the batch ends
+        self.assertIsNone(app.extraction_cache.get(self.cache_key)['entities'])
+
+        self.assertEqual(self.run_backfill(poll, batches, self.store), 0)
+        self.assertEqual(self.store.counts(), {'succeeded': 1})
+        self.assertEqual(self.store.open_batches(), [])
+        document = app.extraction_cache.get(self.cache_key)
+        self.assertEqual(document['entities']['company_name'], 'Unknown')
+        self.assertEqual(document['entities']['assets']['total_assets'], 0.0)
+        self.assertEqual(document['prompt_options'], backfill.backfill_options())
+
+        # Nothing is left to submit for the same files
+        self.assertEqual(self.submit(batches), 0)
+
+    def test_errored_requests_are_submitted_again(self):
+        refused = LocalBatches(os.path.join(self.directory, 'refused'), respond=refuse)
+        self.assertEqual(self.submit(refused), 1)
+        self.run_backfill(poll, refused, self.store)
+        self.assertEqual(self.store.counts(), {'errored': 1})
+        self.assertIsNone(app.extraction_cache.get(self.cache_key)['entities'])
+
+        batches = LocalBatches(os.path.join(self.directory, 'local-batches'))
+        self.assertEqual(self.submit(batches), 1)
+        self.assertEqual(self.store.counts(), {'submitted': 1})
+        self.run_backfill(poll, batches, self.store)
+        self.assertEqual(self.store.counts(), {'succeeded': 1})
+        self.assertIsNotNone(app.extraction_cache.get(self.cache_key)['entities'])
+
+
+if __name__ == '__main__':
+    unittest.main()
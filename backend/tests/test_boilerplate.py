@@ -0,0 +1,69 @@
+import unittest
+
+from boilerplate import boilerplate_hashes, estimate_tokens, strip_boilerplate
+
+
+def narrative_page(number, body):
+    return (number, f'ACME Holdings Inc. Annual Report 2023\n{body}\nPage {number} of 40')
+
+
+class StripBoilerplateTest(unittest.TestCase):
+
+    def test_strips_running_header_and_page_numbers(self):
+        pages = [narrative_page(number, f'Paragraph about topic {number}.') for number in range(1, 7)]
+        stripped, removed = strip_boilerplate(pages)
+        # First occurrences are kept
+        self.assertEqual(stripped[0][1], pages[0][1])
+        for number, text in stripped[1:]:
+            self.assertEqual(text, f'Paragraph about topic {number}.')
+        self.assertEqual(len(removed), 10)
+
+    def test_keeps_statement_rows_that_only_differ_in_amounts(self):
+        pages = [
+            (1, 'Selected financial data\nTotal assets 12,345\nNet income 1,100'),
+            (2, 'Consolidated Balance Sheet\nCash 500\nTotal assets 9,100'),
+            (3, 'Consolidated Statement of Income\nRevenue 4,000\nNet income 800'),
+            (4, 'Segment information\nTotal assets 7,000\nNet income 300'),
+        ]
+        stripped, removed = strip_boilerplate(pages, min_share=0.5, min_pages=4)
+        self.assertEqual(removed, [])
+        self.assertEqual(stripped, pages)
+
+    def test_detects_boilerplate_over_the_whole_document(self):
+        # A line repeated on two of four selected pages is not boilerplate in a
+        # 40-page document where it appears nowhere else
+        document_texts = [f'Narrative page {number}' for number in range(1, 41)]
+        pages = [
+            (19, 'Selected financial data\nTotal assets 9,100'),
+            (20, 'Consolidated Balance Sheet\nTotal assets 9,100'),
+            (21, 'Consolidated Statement of Income\nNet income 800'),
+            (22, 'Segment information\nNet income 800'),
+        ]
+        self.assertTrue(boilerplate_hashes([text for _, text in pages]))
+        stripped, removed = strip_boilerplate(pages, document_texts=document_texts)
+        self.assertEqual(removed, [])
+        self.assertEqual(stripped, pages)
+
+    def test_page_numbers_only_match_in_header_and_footer_lines(self):
+        pages = [
+            (number, '\n'.join([f'Note {number}', f'alpha {number}', f'beta {number}', f'gamma {number}', str(number),
+                                 f'delta {number}', f'epsilon {number}', f'zeta {number}', f'- {number} -']))
+            for number in range(1, 5)
+        ]
+        stripped, removed = strip_boilerplate(pages)
+        # The footer page numbers go, the bare numbers mid-page stay
+        self.assertEqual(removed, ['- 2 -', '- 3 -', '- 4 -'])
+        for number, text in stripped:
+            self.assertIn(f'\n{number}\n', text)
+
+    def test_short_documents_are_left_alone(self):
+        pages = [narrative_page(number, 'Body') for number in range(1, 4)]
+        self.assertEqual(strip_boilerplate(pages), (pages, []))
+
+    def test_estimate_tokens_rounds_up(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('abcde'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from boilerplate import estimate_tokens
+from chunked_extraction import chunk_pages, merge_entities
+
+
+class ChunkPagesTest(unittest.TestCase):
+
+    def test_chunks_break_between_pages_in_order(self):
+        # 10 tokens a page, 11 with the newline that joins it
+        pages = [(number, 'x' * 40) for number in range(1, 6)]
+        chunks = chunk_pages(pages, token_budget=25)
+        self.assertEqual([[number for number, _ in chunk] for chunk in chunks], [[1, 2], [3, 4], [5]])
+        self.assertEqual([page for chunk in chunks for page in chunk], pages)
+
+    def test_only_pages_over_the_budget_are_split(self):
+        long_page = '\n'.join(['y' * 30] * 10)
+        chunks = chunk_pages([(1, 'short'), (2, long_page), (3, 'short')], token_budget=20)
+        pieces = [piece for chunk in chunks for piece in chunk]
+        self.assertEqual(pieces[0], (1, 'short'))
+        self.assertEqual(pieces[-1], (3, 'short'))
+        self.assertGreater(len(pieces), 3)
+        self.assertEqual('\n'.join(text for number, text in pieces if number == 2), long_page)
+        for chunk in chunks:
+            self.assertLessEqual(sum(estimate_tokens(text) + 1 for _, text in chunk), 20)
+
+
+class MergeEntitiesTest(unittest.TestCase):
+
+    def test_each_field_comes_from_the_chunk_that_found_it(self):
+        partials = [
+            {'company_name': 'ACME', 'assets': {'cash': 500.0, 'total_assets': 0.0}, 'revenue': 0.0},
+            {'company_name': 'Unknown', 'assets': {'cash': 0.0, 'total_assets': 9100.0}, 'revenue': 0.0},
+            {'company_name': 'Unknown', 'assets': {'cash': 0.0, 'total_assets': 0.0}, 'revenue': 4000.0},
+        ]
+        self.assertEqual(merge_entities(partials), {
+            'company_name': 'ACME',
+            'assets': {'cash': 500.0, 'total_assets': 9100.0},
+            'revenue': 4000.0
+        })
+
+    def test_disagreements_go_to_the_most_common_then_earliest_value(self):
+        self.assertEqual(merge_entities([{'cash': 1.0}, {'cash': 2.0}, {'cash': 2.0}]), {'cash': 2.0})
+        self.assertEqual(merge_entities([{'cash': 0.0}, {'cash': 3.0}, {'cash': 2.0}]), {'cash': 3.0})
+
+    def test_fields_no_chunk_found_keep_the_first_value(self):
+        merged = merge_entities([{'company_name': 'Unknown', 'cash': 0.0}, {'company_name': '', 'cash': 0.0}])
+        self.assertEqual(merged, {'company_name': 'Unknown', 'cash': 0.0})
+
+    def test_fields_missing_from_some_chunks_are_kept(self):
+        self.assertEqual(merge_entities([{'cash': 1.0}, {'debt': 2.0}]), {'cash': 1.0, 'debt': 2.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+import disk_lru
+
+
+def is_json(dirent):
+    return dirent.name.endswith('.json')
+
+
+class DiskLruTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.directory = tmp_dir.name
+
+    def put(self, name, value, mtime):
+        path = os.path.join(self.directory, name)
+        disk_lru.write_json(self.directory, path, value)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_write_replaces_without_leaving_temp_files(self):
+        path = self.put('a.json', [1], 1)
+        self.put('a.json', [2], 2)
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), '[2]')
+        self.assertEqual(os.listdir(self.directory), ['a.json'])
+
+    def test_evicts_least_recently_used_first(self):
+        for mtime, name in enumerate(['old.json', 'mid.json', 'new.json']):
+            self.put(name, 'x' * 10, mtime)
+        disk_lru.evict(self.directory, is_json, max_entries=2)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['mid.json', 'new.json'])
+        # 12 bytes an entry
+        disk_lru.evict(self.directory, is_json, max_bytes=20)
+        self.assertEqual(os.listdir(self.directory), ['new.json'])
+
+    def test_other_files_are_left_alone(self):
+        self.put('a.json', 1, 1)
+        self.put('b.tmp', 1, 0)
+        disk_lru.evict(self.directory, is_json, max_entries=0)
+        self.assertEqual(os.listdir(self.directory), ['b.tmp'])
+
+    def test_touch_and_remove_of_evicted_entries(self):
+        path = self.put('a.json', 1, 1)
+        self.assertTrue(disk_lru.touch(path))
+        disk_lru.remove(path)
+        disk_lru.remove(path)
+        self.assertFalse(disk_lru.touch(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import contextlib
+import io
+import logging
+import multiprocessing
+import signal
+import time
+import unittest
+from unittest import mock
+
+import pdf_extraction
+from benchmarks.synthetic import synthetic_report
+from pdf_extraction import _iter_engine_pages, _PdfiumEngine, iter_pdf_pages
+
+page_text = _PdfiumEngine.page_text
+
+
+class PageTimeoutTest(unittest.TestCase):
+
+    def setUp(self):
+        # As in the app: pdfminer logs every object it parses, and a handler
+        # that fails (here, on the alarm's exception) only reports it
+        root = logging.getLogger()
+        self.addCleanup(root.setLevel, root.level)
+        handler = logging.StreamHandler(io.StringIO())
+        root.addHandler(handler)
+        self.addCleanup(root.removeHandler, handler)
+        root.setLevel(logging.DEBUG)
+
+    def test_pages_over_budget_are_skipped_with_debug_logging(self):
+        page_timeout = 0.05
+        data = synthetic_report(pages=40, rows=15, layout='plain')
+        with contextlib.redirect_stderr(io.StringIO()):
+            pages = list(_iter_engine_pages(data, list(range(1, 41)), 'pdfplumber', page_timeout=page_timeout))
+        self.assertEqual([page[0] for page in pages], list(range(1, 41)))
+        self.assertTrue(any(skip_reason for *_, skip_reason in pages))
+        for page_number, text, seconds, skip_reason in pages:
+            if skip_reason:
+                self.assertEqual((text, skip_reason), ('', 'page_timeout'))
+            else:
+                # Every page that ran over its budget was caught
+                self.assertLess(seconds, page_timeout + 0.02, page_number)
+
+
+def stuck_on_page_6(self, page_number):
+    # Hangs where the page alarm can't reach it, like a page stuck in C code
+    if page_number == 6:
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+        time.sleep(60)
+    return page_text(self, page_number)
+
+
+class WatchdogTest(unittest.TestCase):
+
+    def test_only_the_stuck_page_is_skipped(self):
+        data = synthetic_report(pages=16)
+        stats = {}
+        # Workers are forked from this process, so they see the patched engine
+        with mock.patch.object(_PdfiumEngine, 'page_text', stuck_on_page_6), \
+                mock.patch.object(pdf_extraction, '_POOL_CONTEXT', multiprocessing.get_context('fork')), \
+                mock.patch.object(pdf_extraction, 'CHUNK_TIMEOUT_SLACK', 0.5):
+            pages = list(iter_pdf_pages(data, workers=2, engine='pdfium', page_timeout=0.5, stats=stats))
+        self.assertEqual([page_number for page_number, _ in pages], list(range(1, 17)))
+        self.assertEqual(stats['skipped_pages'], {6: 'page_timeout'})
+        for page_number, text in pages:
+            if page_number != 6:
+                self.assertIn(f'Page {page_number}', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from benchmarks.synthetic import synthetic_report
+from preflight import PreflightError, preflight
+
+
+class PreflightTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = synthetic_report(pages=3)
+
+    def assertRejected(self, data, reason):
+        with self.assertRaises(PreflightError) as raised:
+            preflight(data)
+        self.assertTrue(str(raised.exception).startswith(reason), raised.exception)
+
+    def test_reports_a_valid_pdf(self):
+        self.assertEqual(preflight(self.data), {
+            'bytes': len(self.data),
+            'version': '1.4',
+            'pages': 3,
+            'encrypted': False,
+            'linearized': False,
+            'producer': 'benchmarks.synthetic'
+        })
+
+    def test_tolerates_junk_around_header_and_end(self):
+        self.assertEqual(preflight(b'\r\n' + self.data + b'\r\n\0')['pages'], 3)
+
+    def test_rejects_payloads_that_are_not_pdfs(self):
+        self.assertRejected(b'', 'not a PDF')
+        self.assertRejected(b'PK\x03\x04 a zip file %%EOF', 'not a PDF')
+        self.assertRejected(b'x' * 2048 + self.data, 'not a PDF')
+
+    def test_rejects_truncated_pdfs(self):
+        self.assertRejected(self.data[:len(self.data) // 2], 'truncated PDF')
+
+    def test_rejects_damaged_pdfs(self):
+        self.assertRejected(b'%PDF-1.4\n' + b'garbage ' * 100 + b'\n%%EOF\n', 'damaged PDF')
+
+
+if __name__ == '__main__':
+    unittest.main()
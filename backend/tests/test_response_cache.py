@@ -0,0 +1,99 @@
+import os
+import tempfile
+import time
+import unittest
+
+from response_cache import DiskTier, MemoryTier, ResponseCache, response_key
+
+TOOLS = [{'name': 'extract', 'input_schema': {'type': 'object'}}]
+
+
+class ResponseKeyTest(unittest.TestCase):
+
+    def test_spacing_does_not_change_the_key(self):
+        self.assertEqual(response_key('model', TOOLS, 'prompt', 'Total  assets\t9,100 \nCash 500'),
+                         response_key('model', TOOLS, 'prompt', 'Total assets 9,100\nCash 500'))
+
+    def test_model_tools_and_prompt_change_the_key(self):
+        key = response_key('model', TOOLS, 'prompt', 'text')
+        self.assertNotEqual(key, response_key('other model', TOOLS, 'prompt', 'text'))
+        self.assertNotEqual(key, response_key('model', [], 'prompt', 'text'))
+        self.assertNotEqual(key, response_key('model', TOOLS, 'other prompt', 'text'))
+        self.assertNotEqual(key, response_key('model', TOOLS, 'prompt', 'other text'))
+
+
+class TierTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.directory = tmp_dir.name
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        tier = MemoryTier(max_entries=2)
+        tier.put('a', 1)
+        tier.put('b', 2)
+        tier.get('a')
+        tier.put('c', 3)
+        self.assertEqual((tier.get('a'), tier.get('b'), tier.get('c')), (1, None, 3))
+        self.assertEqual(tier.size(), 2)
+
+    def test_expired_entries_are_dropped(self):
+        for tier in [MemoryTier(max_entries=10, ttl=60), DiskTier(self.directory, max_bytes=1024 * 1024, ttl=60)]:
+            with self.subTest(tier=tier.name):
+                tier.put('old', {'cash': 1.0}, created=time.time() - 61)
+                tier.put('new', {'cash': 2.0}, created=time.time() - 59)
+                self.assertIsNone(tier.get('old'))
+                self.assertEqual(tier.get('new'), {'cash': 2.0})
+                self.assertEqual(tier.size(), 1)
+
+    def test_disk_tier_keeps_within_max_bytes(self):
+        tier = DiskTier(self.directory, max_bytes=200)
+        for index in range(5):
+            tier.put(f'key{index}', 'x' * 50, created=index + 1)
+        self.assertLess(tier.size(), 5)
+        self.assertEqual(tier.get('key4'), 'x' * 50)
+
+    def test_unreadable_disk_entries_are_discarded(self):
+        tier = DiskTier(self.directory, max_bytes=1024 * 1024)
+        with open(os.path.join(self.directory, 'broken.json'), 'w', encoding='utf-8') as f:
+            f.write('{"created": ')
+        with self.assertLogs('response_cache', 'WARNING'):
+            self.assertIsNone(tier.get('broken'))
+        self.assertEqual(tier.size(), 0)
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.disk = DiskTier(tmp_dir.name, max_bytes=1024 * 1024)
+        self.memory = MemoryTier(max_entries=10)
+        self.cache = ResponseCache([self.memory, self.disk])
+
+    def test_puts_go_to_every_tier(self):
+        self.cache.put('key', {'cash': 1.0})
+        self.assertEqual(self.memory.get('key'), {'cash': 1.0})
+        self.assertEqual(self.disk.get('key'), {'cash': 1.0})
+
+    def test_disk_hits_are_copied_to_memory(self):
+        self.disk.put('key', {'cash': 1.0})
+        self.assertIsNone(self.memory.get('key'))
+        self.assertEqual(self.cache.get('key'), {'cash': 1.0})
+        self.assertEqual(self.memory.get('key'), {'cash': 1.0})
+        self.assertEqual(self.cache.get('key'), {'cash': 1.0})
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.stats(), {
+            'hits': {'memory': 1, 'disk': 1},
+            'misses': 1,
+            'hit_rate': 0.667,
+            'entries': {'memory': 1, 'disk': 1}
+        })
+
+    def test_stats_before_any_lookup(self):
+        self.assertIsNone(self.cache.stats()['hit_rate'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from benchmarks.synthetic import BALANCE_SHEET_LABELS, INCOME_STATEMENT_LABELS, synthetic_report
+from statement_tables import _parse_table, extract_statement_tables, parse_amount
+
+
+class ExtractStatementTablesTest(unittest.TestCase):
+
+    def check_layout(self, layout):
+        # 4 pages: the balance sheet is page 2, the income statement page 3
+        data = synthetic_report(pages=4, rows=12, layout=layout)
+        tables = extract_statement_tables(data, [2, 3])
+        self.assertEqual([table['page'] for table in tables], [2, 3])
+        for table, labels, total in ((tables[0], BALANCE_SHEET_LABELS, 'Total assets'),
+                                     (tables[1], INCOME_STATEMENT_LABELS, 'Net income')):
+            self.assertEqual(table['periods'], ['2023', '2022'])
+            expected = [labels[i % len(labels)] + (f' {i // len(labels) + 1}' if i >= len(labels) else '')
+                        for i in range(12)] + [total]
+            self.assertEqual([row['label'] for row in table['rows']], expected)
+            for row in table['rows']:
+                self.assertEqual(len(row['values']), 2)
+
+    def test_plain_layout(self):
+        self.check_layout('plain')
+
+    def test_ruled_layout(self):
+        self.check_layout('ruled')
+
+
+class ParseTableTest(unittest.TestCase):
+
+    def test_label_split_across_cells(self):
+        table = [['', '', '2023', '2022'], ['C', 'ash and cash', '1,234', '(56)'], ['(', '', '1', '']]
+        parsed = _parse_table(table)
+        self.assertEqual(parsed['periods'], ['2023', '2022'])
+        # The footnote marker row has no word for a label and is dropped
+        self.assertEqual(parsed['rows'], [{'label': 'C ash and cash', 'values': [1234.0, -56.0]}])
+
+    def test_parse_amount(self):
+        self.assertEqual(parse_amount('(1,234)'), -1234.0)
+        self.assertEqual(parse_amount('—'), 0.0)
+        self.assertIsNone(parse_amount('Total'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import text_store
+from text_store import TextStore
+
+
+def random_pages(count, seed=0):
+    # Text that barely compresses, with some non-ASCII, so pages span several blocks
+    rng = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz 0123456789,.€é\n'
+    return [
+        (number, ''.join(rng.choice(alphabet) for _ in range(rng.randrange(0, 3000))))
+        for number in range(1, count + 1)
+    ]
+
+
+class TextStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.directory = tmp_dir.name
+        self.store = TextStore(self.directory, max_documents=2)
+
+    def test_round_trip_across_blocks(self):
+        pages = random_pages(40)
+        with mock.patch.object(text_store, 'BLOCK_BYTES', 8 * 1024):
+            self.store.put('doc', pages)
+        self.assertTrue(self.store.has('doc'))
+        self.assertEqual(self.store.get('doc'), pages)
+
+    def test_page_ranges(self):
+        pages = random_pages(40)
+        with mock.patch.object(text_store, 'BLOCK_BYTES', 8 * 1024):
+            self.store.put('doc', pages)
+        self.assertEqual(self.store.get('doc', 10, 12), pages[9:12])
+        self.assertEqual(self.store.get('doc', first_page=38), pages[37:])
+        self.assertEqual(self.store.get('doc', last_page=1), pages[:1])
+        self.assertEqual(self.store.get('doc', 41), [])
+
+    def test_sparse_page_numbers_and_empty_documents(self):
+        pages = [(3, 'Balance sheet'), (7, ''), (20, 'Income statement')]
+        self.store.put('doc', pages)
+        self.assertEqual(self.store.get('doc', 4, 20), pages[1:])
+        self.store.put('empty', [])
+        self.assertEqual(self.store.get('empty'), [])
+
+    def test_put_replaces_and_evicts_least_recently_used(self):
+        self.store.put('a', [(1, 'old')])
+        self.store.put('a', [(1, 'new')])
+        self.assertEqual(self.store.get('a'), [(1, 'new')])
+        self.store.put('b', [(1, 'b')])
+        os.utime(os.path.join(self.directory, 'a.pages'), (1, 1))
+        self.store.put('c', [(1, 'c')])
+        self.assertIsNone(self.store.get('a'))
+        self.assertFalse(self.store.has('a'))
+        self.assertEqual(sorted(os.listdir(self.directory)), ['b.pages', 'c.pages'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import os
+import struct
+import zlib
+
+import disk_lru
+
+# Pages are packed into blocks of about this much UTF-8 text before compression;
+# reading a page decompresses only its block
+BLOCK_BYTES = 64 * 1024
+
+# File layout: compressed blocks, then the JSON index, then the index length
+_TRAILER = struct.Struct('<Q')
+
+
+class TextStore:
+    """On-disk store of extracted page text, one file per document digest.
+
+    Consecutive pages are grouped into zlib-compressed blocks of about
+    BLOCK_BYTES, and an index at the end of the file maps each page to its
+    block and byte range. Reading a page range seeks to and decompresses only
+    the blocks that hold it, so no document is ever loaded whole. Files are
+    written and evicted through disk_lru, keeping at most max_documents.
+    """
+
+    def __init__(self, directory, max_documents):
+        self.directory = directory
+        self.max_documents = max_documents
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f'{digest}.pages')
+
+    def has(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def put(self, digest, pages):
+        """Store (page_number, text) pages under digest, replacing what was there."""
+        blocks = []
+        index = []
+        block = bytearray()
+        for page_number, text in pages:
+            data = text.encode('utf-8')
+            if block and len(block) + len(data) > BLOCK_BYTES:
+                blocks.append(zlib.compress(bytes(block)))
+                block = bytearray()
+            index.append((page_number, len(blocks), len(block), len(block) + len(data)))
+            block += data
+        if block:
+            blocks.append(zlib.compress(bytes(block)))
+
+        offsets = []
+        position = 0
+        for compressed in blocks:
+            offsets.append((position, len(compressed)))
+            position += len(compressed)
+        header = json.dumps({'pages': index, 'blocks': offsets}).encode('utf-8')
+
+        def write(f):
+            for compressed in blocks:
+                f.write(compressed)
+            f.write(header)
+            f.write(_TRAILER.pack(len(header)))
+
+        disk_lru.write_atomic(self.directory, self._path(digest), write, binary=True)
+        disk_lru.evict(self.directory, lambda dirent: dirent.name.endswith('.pages'), max_entries=self.max_documents)
+
+    def get(self, digest, first_page=None, last_page=None):
+        """Return the stored (page_number, text) pages of digest between first_page and last_page.
+
+        Both bounds are inclusive and optional. Returns None if nothing is
+        stored under digest.
+        """
+        path = self._path(digest)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            (header_length,) = _TRAILER.unpack(f.read(_TRAILER.size))
+            f.seek(-_TRAILER.size - header_length, os.SEEK_END)
+            index = json.loads(f.read(header_length))
+            wanted = [
+                entry for entry in index['pages']
+                if (first_page is None or entry[0] >= first_page) and (last_page is None or entry[0] <= last_page)
+            ]
+            blocks = {}
+            pages = []
+            for page_number, block, start, end in wanted:
+                if block not in blocks:
+                    offset, length = index['blocks'][block]
+                    f.seek(offset)
+                    blocks[block] = zlib.decompress(f.read(length))
+                pages.append((page_number, blocks[block][start:end].decode('utf-8')))
+        disk_lru.touch(path)
+        return pages
@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import disk_lru
+from pdf_extraction import open_pdfplumber
+
+# Word boxes in pdfplumber's coordinates: points from the page's top-left corner
+COLUMNS = ('x0', 'x1', 'top', 'bottom')
+
+
+class WordStore:
+    """On-disk store of word positions, one directory per document digest.
+
+    A document's words are stored as columns: float32 .npy arrays for the box
+    edges in COLUMNS, an int32 array of token ids into the document's table of
+    distinct words, and page offsets into those arrays. That is 20 bytes a
+    word, where pdfplumber keeps a dict of a few dozen fields per character.
+    Reads memory-map the arrays, so a query only touches the pages it needs
+    and never re-parses the PDF. Directories are evicted through disk_lru,
+    keeping at most max_documents documents.
+    """
+
+    def __init__(self, directory, max_documents):
+        self.directory = directory
+        self.max_documents = max_documents
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest)
+
+    def has(self, digest):
+        return os.path.isdir(self._path(digest))
+
+    def build(self, digest, pdf_path):
+        """Extract the words of every page of pdf_path and store them under digest."""
+        tokens = {}
+        token_ids = []
+        boxes = []
+        offsets = [0]
+        sizes = []
+        with open_pdfplumber(pdf_path) as pdf:
+            for page in pdf.pages:
+                words = page.extract_words()
+                token_ids.append(np.array([tokens.setdefault(word['text'], len(tokens)) for word in words], dtype=np.int32))
+                boxes.append(np.array([[word[column] for column in COLUMNS] for word in words], dtype=np.float32).reshape(-1, len(COLUMNS)))
+                offsets.append(offsets[-1] + len(words))
+                sizes.append((page.width, page.height))
+                page.close()
+
+        # Built in a temporary directory that is renamed into place, as disk_lru does with files
+        tmp_path = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        try:
+            boxes = np.concatenate(boxes) if boxes else np.zeros((0, len(COLUMNS)), dtype=np.float32)
+            for index, column in enumerate(COLUMNS):
+                np.save(os.path.join(tmp_path, f'{column}.npy'), np.ascontiguousarray(boxes[:, index]))
+            np.save(os.path.join(tmp_path, 'token.npy'), np.concatenate(token_ids) if token_ids else np.zeros(0, dtype=np.int32))
+            np.save(os.path.join(tmp_path, 'page_offsets.npy'), np.array(offsets, dtype=np.int64))
+            np.save(os.path.join(tmp_path, 'page_sizes.npy'), np.array(sizes, dtype=np.float32).reshape(-1, 2))
+            with open(os.path.join(tmp_path, 'tokens.json'), 'w', encoding='utf-8') as f:
+                json.dump(list(tokens), f)
+            try:
+                os.rename(tmp_path, self._path(digest))
+            except OSError:
+                # Another request stored the same document first
+                shutil.rmtree(tmp_path, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        disk_lru.evict(self.directory, self._is_entry, max_entries=self.max_documents)
+
+    def open(self, digest):
+        """Return the DocumentWords of digest, or None if they were never stored."""
+        path = self._path(digest)
+        try:
+            words = DocumentWords(path)
+        except FileNotFoundError:
+            return None
+        disk_lru.touch(path)
+        return words
+
+    @staticmethod
+    def _is_entry(dirent):
+        # Temporary directories of builds in progress start with a dot
+        return dirent.is_dir() and not dirent.name.startswith('.')
+
+
+class DocumentWords:
+    # Memory-mapped word columns of one document
+
+    def __init__(self, path):
+        self.columns = {column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r') for column in COLUMNS}
+        self.token = np.load(os.path.join(path, 'token.npy'), mmap_mode='r')
+        self.page_offsets = np.load(os.path.join(path, 'page_offsets.npy'))
+        self.page_sizes = np.load(os.path.join(path, 'page_sizes.npy'))
+        with open(os.path.join(path, 'tokens.json'), encoding='utf-8') as f:
+            self.tokens = json.load(f)
+
+    @property
+    def page_count(self):
+        return len(self.page_sizes)
+
+    def page_size(self, page_number):
+        width, height = self.page_sizes[page_number - 1]
+        return {'width': float(width), 'height': float(height)}
+
+    def _words(self, indices):
+        pages = np.searchsorted(self.page_offsets, indices, side='right')
+        columns = {column: values[indices] for column, values in self.columns.items()}
+        token = self.token[indices]
+        return [
+            {
+                'page': int(pages[i]),
+                'text': self.tokens[token[i]],
+                **{column: round(float(columns[column][i]), 2) for column in COLUMNS}
+            }
+            for i in range(len(indices))
+        ]
+
+    def page_words(self, page_number):
+        """All words of a (1-based) page, in reading order."""
+        start, end = self.page_offsets[page_number - 1], self.page_offsets[page_number]
+        return self._words(np.arange(start, end))
+
+    def find(self, text, page_number=None):
+        """Words equal to text (ignoring case), optionally on one page only."""
+        text = text.casefold()
+        ids = np.array([i for i, token in enumerate(self.tokens) if token.casefold() == text], dtype=np.int32)
+        start, end = 0, len(self.token)
+        if page_number is not None:
+            start, end = self.page_offsets[page_number - 1], self.page_offsets[page_number]
+        indices = np.flatnonzero(np.isin(self.token[start:end], ids)) + start
+        return self._words(indices)